@@ -1,8 +1,37 @@
-from fetch_news import get_top_headlines, clean_articles
-from fetch_nyt import get_nyt_articles
-from fetch_guardian import get_guardian_articles
-from fetch_rss import get_rss_articles
+import asyncio
+import base64
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+import fetch_guardian
+import fetch_news
+import fetch_nyt
+import fetch_rss
+from fetch_news import get_top_headlines, get_top_headlines_async, clean_articles
+from fetch_nyt import get_nyt_articles, get_nyt_articles_async
+from fetch_guardian import get_guardian_articles, get_guardian_articles_async
+from fetch_rss import get_rss_articles, get_rss_articles_async
 from relevance import filter_articles
+import dedup
+import store
+import search_index
+
+# Overall deadline (seconds) for one concurrent fan-out across all sources;
+# fetch_rss.GLOBAL_TIMEOUT is kept below it
+FANOUT_TIMEOUT = 8
+
+# Accepted values of search_all_sources' remote
+REMOTE_MODES = ("auto", "always", "never")
+
+# Shared pool for source fan-out; sized for a few overlapping requests
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="fanout")
+
+# Sources dropped (timed out) or failed in the last fan-out, keyed by sector
+fanout_status = {}
+
+# Async fetches that outlived their fan-out deadline; held so they can
+# finish (and fill the caches) without being garbage collected
+_background = set()
 
 # Sectors that each source supports
 NEWSAPI_SECTORS = {
@@ -41,101 +70,492 @@ SECTOR_TO_NEWSAPI = {
 }
 
 
-def get_all_news(sector="all", count=20):
-    """Fetch from all sources and combine results for a given sector."""
-    all_articles = []
+def get_all_news(sector="all", count=20, concurrent=True):
+    """Fetch from all sources and combine results for a given sector.
+
+    While the sector's sources were fetched within store.STORE_TTL, the
+    view is answered from the article store. Otherwise the sources are
+    fetched (which ingests new articles into the store): with
+    concurrent=True every source runs in parallel under one
+    FANOUT_TIMEOUT deadline, otherwise they are called one by one.
+    """
+    stored = _stored_view(sector, count)
+    if stored:
+        return stored
+
+    jobs = _source_jobs(sector)
+    if concurrent:
+        all_articles = _fan_out(jobs, sector)
+    else:
+        all_articles = _run_sequential(jobs, sector)
+
+    return _merged_view(all_articles, sector, count)
+
+
+async def get_all_news_async(sector="all", count=20):
+    """
+    get_all_news for the async serving path. Every source is awaited
+    concurrently on the event loop under the same FANOUT_TIMEOUT deadline.
+    """
+    # Store reads and writes (SQLite) run in a thread, off the event loop
+    stored = await asyncio.to_thread(_stored_view, sector, count)
+    if stored:
+        return stored
+
+    all_articles = await _fan_out_async(_source_jobs(sector, asynchronous=True), sector)
+
+    return await asyncio.to_thread(_merged_view, all_articles, sector, count)
+
+
+def stream_all_news(sector="all", count=20):
+    """
+    Streaming version of get_all_news.
+    Yields a "source" event with that source's relevant articles as each
+    source finishes, then one "final" event carrying the same deduplicated,
+    relevance-sorted list get_all_news would return.
+    """
+    stored = _stored_view(sector, count)
+    if stored:
+        yield {"event": "final", "sector": sector, "articles": stored}
+        return
+
+    jobs = _source_jobs(sector)
+    results = {}
+    for name, articles in _iter_fan_out(jobs, sector):
+        results[name] = articles
+        yield {
+            "event": "source",
+            "source": name,
+            "articles": _rank(articles, sector)[:count],
+        }
+
+    all_articles = [a for name, _ in jobs for a in results.get(name, [])]
+    yield {
+        "event": "final",
+        "sector": sector,
+        "articles": _merged_view(all_articles, sector, count),
+        **fanout_status.get(sector, {}),
+    }
+
+
+async def stream_all_news_async(sector="all", count=20):
+    """stream_all_news for the async serving path."""
+    stored = await asyncio.to_thread(_stored_view, sector, count)
+    if stored:
+        yield {"event": "final", "sector": sector, "articles": stored}
+        return
+
+    jobs = _source_jobs(sector, asynchronous=True)
+    results = {}
+    async for name, articles in _iter_fan_out_async(jobs, sector):
+        results[name] = articles
+        ranked = await asyncio.to_thread(_rank, articles, sector)
+        yield {"event": "source", "source": name, "articles": ranked[:count]}
+
+    all_articles = [a for name, _ in jobs for a in results.get(name, [])]
+    yield {
+        "event": "final",
+        "sector": sector,
+        "articles": await asyncio.to_thread(_merged_view, all_articles, sector, count),
+        **fanout_status.get(sector, {}),
+    }
+
+
+def get_news_page(sector="all", count=20, cursor=None):
+    """
+    One page of a sector's ranked stream (see store.sector_page): the
+    articles after `cursor`, a previous page's next_cursor, plus the
+    cursor for the page after them (None once the stream runs out).
+    Pages are read from the article store; no source is fetched.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    read, articles = [], []
+    exhausted = False
+    # Deduplication can drop rows, so keep reading until the page is full
+    while len(articles) < count and not exhausted:
+        limit = (count - len(articles)) * 2
+        rows = store.sector_page(sector, limit=limit, after=after)
+        exhausted = len(rows) < limit
+        if rows:
+            after = rows[-1][0]
+        read += rows
+        articles = _deduplicate(articles + [article for _, article in rows])
+
+    page = articles[:count]
+    if not page:
+        return [], None
+    # The cursor goes after the page's last article and any duplicates of
+    # served articles that follow it, so the next page doesn't repeat them
+    kept = {id(article) for article in articles}
+    position = next(i for i, (_, article) in enumerate(read) if article is page[-1])
+    while position + 1 < len(read) and id(read[position + 1][1]) not in kept:
+        position += 1
+    last = read[position][0]
+    # Rows were read past the page, or there may be more in the store
+    more = position + 1 < len(read) or (not exhausted and _has_after(sector, last))
+    return page, encode_cursor(last) if more else None
+
 
+def next_cursor(sector, articles, count):
+    """
+    next_cursor for a first page of `count` articles served from
+    get_all_news (or the prewarmer), for fetching the rest with
+    get_news_page.
+    """
+    if not articles or len(articles) < count:
+        return None
+    last = articles[-1]
+    url = last.get("url") or ""
+    score = store.sector_scores([url], sector).get(url, 0.0)
+    key = (score, last.get("published_ts") or 0, url)
+    return encode_cursor(key) if _has_after(sector, key) else None
+
+
+def get_news_since(sector="all", since=None, count=100, wait=0):
+    """
+    Articles in a sector ingested after sequence number `since`, oldest
+    first, plus the sequence number to pass as `since` next time. Without
+    `since`, no articles and the current sequence number (the sync point).
+    With `wait`, long-poll: block up to `wait` seconds until there is
+    something new for the sector.
+    """
+    if since is None:
+        return [], store.latest_id()
+    deadline = time.monotonic() + wait
+    while True:
+        articles, since = store.sector_since(sector, since, limit=count)
+        remaining = deadline - time.monotonic()
+        if articles or remaining <= 0:
+            return _deduplicate(articles), since
+        store.wait_for_articles(since, remaining)
+
+
+async def get_news_since_async(sector="all", since=None, count=100, wait=0):
+    """
+    get_news_since for the async serving path: store reads run in a
+    thread, and the long-poll sleeps on the event loop, re-checking the
+    store every store.POLL_INTERVAL seconds.
+    """
+    if since is None:
+        return [], await asyncio.to_thread(store.latest_id)
+    deadline = time.monotonic() + wait
+    while True:
+        articles, since = await asyncio.to_thread(
+            store.sector_since, sector, since, limit=count)
+        remaining = deadline - time.monotonic()
+        if articles or remaining <= 0:
+            return _deduplicate(articles), since
+        await asyncio.sleep(min(remaining, store.POLL_INTERVAL))
+
+
+def encode_cursor(key):
+    """Opaque token for a (score, published_ts, url) position in a stream."""
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """The (score, published_ts, url) key in a cursor; ValueError if malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        score, published_ts, url = json.loads(base64.urlsafe_b64decode(padded))
+        return float(score), int(published_ts), str(url)
+    except (ValueError, TypeError) as e:
+        raise ValueError("invalid cursor") from e
+
+
+def search_all_sources(query, count=20, remote="auto", concurrent=True):
+    """
+    Search the local index of every ingested article.
+    remote="auto" falls back to the NYT and Guardian search APIs only when
+    the index has no match; "always" merges them in after the local hits
+    and "never" keeps the search local. Any other remote raises ValueError.
+    """
+    _check_remote(remote)
+    try:
+        local = search_index.search(query, limit=count)
+    except Exception as e:
+        print(f"  [ERROR] Local search: {e}")
+        local = []
+
+    if remote == "never" or (remote == "auto" and local):
+        return local[:count]
+
+    jobs = _search_jobs(query)
+    if concurrent:
+        all_articles = _fan_out(jobs, "search")
+    else:
+        all_articles = _run_sequential(jobs, "search")
+
+    unique = _deduplicate(local + all_articles)
+    return unique[:count]
+
+
+async def search_all_sources_async(query, count=20, remote="auto"):
+    """search_all_sources for the async serving path."""
+    _check_remote(remote)
+    try:
+        # Syncing the index reads the store; keep it off the event loop
+        local = await asyncio.to_thread(search_index.search, query, limit=count)
+    except Exception as e:
+        print(f"  [ERROR] Local search: {e}")
+        local = []
+
+    if remote == "never" or (remote == "auto" and local):
+        return local[:count]
+
+    all_articles = await _fan_out_async(
+        _search_jobs(query, asynchronous=True), "search")
+
+    unique = _deduplicate(local + all_articles)
+    return unique[:count]
+
+
+def _check_remote(remote):
+    if remote not in REMOTE_MODES:
+        raise ValueError(f"remote must be one of: {', '.join(REMOTE_MODES)}")
+
+
+def source_cache_keys(sector):
+    """(namespace, key) of each source cache entry a sector view reads."""
+    source_sector = None if sector == "all" else sector
+    keys = {
+        "NewsAPI": ("newsapi", fetch_news.cache_key_for(
+            SECTOR_TO_NEWSAPI.get(sector, "general"))),
+        "NYT": ("nyt", fetch_nyt.cache_key_for(source_sector)),
+        "Guardian": ("guardian", fetch_guardian.cache_key_for(source_sector)),
+        "RSS": ("rss", fetch_rss.cache_key_for(source_sector)),
+    }
+    return [keys[name] for name, _ in _source_jobs(sector)]
+
+
+def _rank(articles, sector):
+    """Deduplicate, then score, filter and sort articles for a sector."""
+    # Deduplicate by URL and title/description similarity
+    unique = _deduplicate(articles)
+    # Articles ingested earlier already carry a score for this sector
+    scores = store.sector_scores([a.get("url") for a in unique], sector)
+    return filter_articles(unique, sector, scores=scores)
+
+
+def _merged_view(all_articles, sector, count):
+    """
+    The sector view after a fan-out. Everything fetched has been ingested
+    by now, so the first page is read from the store's ranked stream, the
+    one the cursor pages continue: a cold view matches a warm one, and no
+    stored article ranked above the cursor is skipped. The fan-out's own
+    ranking is served if the store can't answer.
+    """
+    ranked = _rank(all_articles, sector)
+    if not ranked:
+        return []
+    store.mark_fresh(sector)
+    return _from_store(sector, count) or ranked[:count]
+
+
+def _has_after(sector, key):
+    """True if the sector's stream has an article after key."""
+    try:
+        return bool(store.sector_page(sector, limit=1, after=key))
+    except Exception as e:
+        print(f"  [ERROR] Store ({sector}): {e}")
+        return False
+
+
+def _stored_view(sector, count):
+    """The sector view from the store while its sources are fresh, else None."""
+    if store.is_fresh(sector):
+        return _from_store(sector, count) or None
+    return None
+
+
+def _from_store(sector, count):
+    """Sector view from the article store's precomputed scores."""
+    try:
+        return get_news_page(sector, count)[0]
+    except Exception as e:
+        print(f"  [ERROR] Store ({sector}): {e}")
+        return []
+
+
+def _fetchers(asynchronous):
+    """Source fetchers by name; the async ones return coroutines."""
+    if asynchronous:
+        async def newsapi(**kwargs):
+            return clean_articles(await get_top_headlines_async(**kwargs))
+
+        return {
+            "newsapi": newsapi,
+            "nyt": get_nyt_articles_async,
+            "guardian": get_guardian_articles_async,
+            "rss": get_rss_articles_async,
+        }
+    return {
+        "newsapi": lambda **kwargs: clean_articles(get_top_headlines(**kwargs)),
+        "nyt": get_nyt_articles,
+        "guardian": get_guardian_articles,
+        "rss": get_rss_articles,
+    }
+
+
+def _source_jobs(sector, asynchronous=False):
+    """
+    Return (name, fetch) pairs for a sector, in merge priority order.
+    With asynchronous=True each fetch() returns a coroutine.
+    """
+    fetch = _fetchers(asynchronous)
     if sector == "all":
         # For "all", get a mix from each source
-        try:
-            raw = get_top_headlines(category="general", count=6)
-            all_articles.extend(clean_articles(raw))
-        except Exception as e:
-            print(f"  [ERROR] NewsAPI (all): {e}")
+        return [
+            ("NewsAPI", lambda: fetch["newsapi"](category="general", count=6)),
+            ("NYT", lambda: fetch["nyt"](sector=None, count=6)),
+            ("Guardian", lambda: fetch["guardian"](sector=None, count=6)),
+            ("RSS", lambda: fetch["rss"](sector=None, count=8)),
+        ]
 
-        try:
-            all_articles.extend(get_nyt_articles(sector=None, count=6))
-        except Exception as e:
-            print(f"  [ERROR] NYT (all): {e}")
+    # RSS first — most relevant for sector-specific views
+    jobs = [("RSS", lambda: fetch["rss"](sector=sector, count=10))]
+
+    # NYT second — good section-based coverage
+    if sector in NYT_SECTORS:
+        jobs.append(("NYT", lambda: fetch["nyt"](sector=sector, count=5)))
+
+    # Guardian third
+    if sector in GUARDIAN_SECTORS:
+        jobs.append(("Guardian", lambda: fetch["guardian"](
+            sector=sector, count=5)))
+
+    # NewsAPI last — broadest categories, most noise
+    if sector in NEWSAPI_SECTORS:
+        category = SECTOR_TO_NEWSAPI.get(sector, "general")
+        jobs.append(("NewsAPI", lambda: fetch["newsapi"](
+            category=category, count=4)))
+
+    return jobs
 
-        try:
-            all_articles.extend(get_guardian_articles(sector=None, count=6))
-        except Exception as e:
-            print(f"  [ERROR] Guardian (all): {e}")
 
+def _search_jobs(query, asynchronous=False):
+    fetch = _fetchers(asynchronous)
+    return [
+        ("NYT search", lambda: fetch["nyt"](query=query, count=8)),
+        ("Guardian search", lambda: fetch["guardian"](query=query, count=8)),
+    ]
+
+
+def _run_sequential(jobs, label):
+    """Call each source in turn and merge their articles in job order."""
+    all_articles = []
+    for name, fetch in jobs:
         try:
-            all_articles.extend(get_rss_articles(sector=None, count=8))
+            all_articles.extend(fetch())
         except Exception as e:
-            print(f"  [ERROR] RSS (all): {e}")
+            print(f"  [ERROR] {name} ({label}): {e}")
+    return all_articles
 
-    else:
-        # RSS first — most relevant for sector-specific views
+
+def _fan_out(jobs, label, timeout=None):
+    """
+    Run every source in parallel and merge the results in job order.
+    Sources still running when the deadline passes are dropped from this
+    response and recorded in fanout_status; they keep running in the
+    background so their caches are warm for the next request.
+    """
+    results = dict(_iter_fan_out(jobs, label, timeout))
+    return [a for name, _ in jobs for a in results.get(name, [])]
+
+
+def _iter_fan_out(jobs, label, timeout=None):
+    """Yield (name, articles) for each source in the order they finish."""
+    timeout = FANOUT_TIMEOUT if timeout is None else timeout
+    futures = {_executor.submit(fetch): name for name, fetch in jobs}
+    finished = []
+    failed = []
+
+    def collect(future):
+        name = futures[future]
+        finished.append(future)
         try:
-            all_articles.extend(get_rss_articles(sector=sector, count=10))
+            return future.result()
         except Exception as e:
-            print(f"  [ERROR] RSS ({sector}): {e}")
-
-        # NYT second — good section-based coverage
-        if sector in NYT_SECTORS:
-            try:
-                all_articles.extend(get_nyt_articles(sector=sector, count=5))
-            except Exception as e:
-                print(f"  [ERROR] NYT ({sector}): {e}")
-
-        # Guardian third
-        if sector in GUARDIAN_SECTORS:
-            try:
-                all_articles.extend(
-                    get_guardian_articles(sector=sector, count=5))
-            except Exception as e:
-                print(f"  [ERROR] Guardian ({sector}): {e}")
-
-        # NewsAPI last — broadest categories, most noise
-        if sector in NEWSAPI_SECTORS:
-            try:
-                category = SECTOR_TO_NEWSAPI.get(sector, "general")
-                raw = get_top_headlines(category=category, count=4)
-                all_articles.extend(clean_articles(raw))
-            except Exception as e:
-                print(f"  [ERROR] NewsAPI ({sector}): {e}")
-
-    # Deduplicate by title similarity
-    unique = _deduplicate(all_articles)
-    filtered = filter_articles(unique, sector)
-    return filtered[:count]
-
-
-def search_all_sources(query, count=20):
-    """Search across all sources that support search."""
-    all_articles = []
+            failed.append(name)
+            print(f"  [ERROR] {name} ({label}): {e}")
+            return None
 
-    # NYT Search
     try:
-        all_articles.extend(get_nyt_articles(query=query, count=8))
-    except Exception as e:
-        print(f"  [ERROR] NYT search: {e}")
+        for future in as_completed(futures, timeout=timeout):
+            articles = collect(future)
+            if articles is not None:
+                yield futures[future], articles
+    except FutureTimeout:
+        # Anything that finished right at the deadline still counts
+        for future in futures:
+            if future.done() and future not in finished:
+                articles = collect(future)
+                if articles is not None:
+                    yield futures[future], articles
+
+    timed_out = [name for future, name in futures.items() if future not in finished]
+    for name in timed_out:
+        print(f"  [TIMEOUT] {name} ({label}) missed the {timeout}s deadline")
+    fanout_status[label] = {"timed_out": timed_out, "failed": failed}
+
 
-    # Guardian Search
+async def _fan_out_async(jobs, label, timeout=None):
+    """
+    _fan_out on the event loop. Sources that miss the deadline keep
+    running as background tasks, as the threaded version's do.
+    """
+    results = {}
+    async for name, articles in _iter_fan_out_async(jobs, label, timeout):
+        results[name] = articles
+    return [a for name, _ in jobs for a in results.get(name, [])]
+
+
+async def _iter_fan_out_async(jobs, label, timeout=None):
+    """_iter_fan_out on the event loop: (name, articles) as each source finishes."""
+    timeout = FANOUT_TIMEOUT if timeout is None else timeout
+    tasks = {asyncio.ensure_future(fetch()): name for name, fetch in jobs}
+    deadline = time.monotonic() + timeout
+    pending = set(tasks)
+    failed = []
     try:
-        all_articles.extend(get_guardian_articles(query=query, count=8))
-    except Exception as e:
-        print(f"  [ERROR] Guardian search: {e}")
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=list(tasks).index):
+                name = tasks[task]
+                if task.exception() is not None:
+                    failed.append(name)
+                    print(f"  [ERROR] {name} ({label}): {task.exception()}")
+                else:
+                    yield name, task.result()
 
-    unique = _deduplicate(all_articles)
-    return unique[:count]
+        timed_out = [name for task, name in tasks.items() if task in pending]
+        for name in timed_out:
+            print(f"  [TIMEOUT] {name} ({label}) missed the {timeout}s deadline")
+        fanout_status[label] = {"timed_out": timed_out, "failed": failed}
+    finally:
+        # Also reached when the consumer stops early (a client disconnect)
+        for task in pending:
+            _background.add(task)
+            task.add_done_callback(_forget)
+
+
+def _forget(task):
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"  [ERROR] Background fetch: {task.exception()}")
 
 
 def _deduplicate(articles):
-    """Remove duplicate articles based on title similarity."""
-    seen_titles = set()
-    unique = []
-    for article in articles:
-        # Create a normalized key from the first 60 chars of the title
-        title_key = article.get("title", "").lower().strip()[:60]
-        if title_key and title_key not in seen_titles:
-            seen_titles.add(title_key)
-            unique.append(article)
-    return unique
+    """
+    Remove duplicate articles: same canonical URL, same title prefix, or a
+    near-identical title + description (see dedup.py). The first article
+    of each group is kept.
+    """
+    return dedup.deduplicate(articles)
 
 
 if __name__ == "__main__":
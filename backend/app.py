@@ -1,14 +1,178 @@
 import os
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
-from aggregator import get_all_news, search_all_sources
+from aggregator import (
+    fanout_status, get_news_page, get_news_since, next_cursor, search_all_sources,
+    source_cache_keys, stream_all_news,
+)
+from breaker import breaker_stats
+from fetch_rss import feed_status
+from cache import cache_stats
+from quota import quota_stats
+from transport import transport_stats
+import http_cache
+import response_cache
+import serializer
+from prewarm import PREWARM_COUNT, fresh_for, get_warm_news, peek_warm_news, start_prewarmer
 
 load_dotenv()
 
 app = Flask(__name__, static_folder="../frontend", static_url_path="")
+app.json = serializer.JSONProvider(app)
 CORS(app)
 
+# Keep every sector warm in the background (set PREWARM=0 to disable)
+if os.environ.get("PREWARM", "1") != "0":
+    start_prewarmer()
+
+# Longest a /api/news/since long-poll may block (seconds)
+MAX_WAIT = 30
+
+# Most articles one /api/news/since response or SSE event may carry
+MAX_DELTA = 500
+
+# Interval (seconds) between /api/news/events keep-alive comments
+SSE_HEARTBEAT = 15
+
+# Map old category names to sectors for backward compatibility
+CATEGORY_TO_SECTOR = {
+    "general": "all",
+    "technology": "technology",
+    "business": "financial",
+    "health": "healthcare",
+    "science": "science",
+    "sports": "all",
+}
+
+
+def resolve_sector(sector, category):
+    """The sector to serve for /api/news's sector (new) or category (legacy) param."""
+    if sector:
+        return sector
+    if category:
+        return CATEGORY_TO_SECTOR.get(category, "all")
+    return "all"
+
+
+def news_max_age(sector, count):
+    """Browser max-age for /api/news: the time left before the sector's refresh."""
+    max_age = fresh_for(sector) if count <= PREWARM_COUNT else None
+    return http_cache.DEFAULT_MAX_AGE if max_age is None else max_age
+
+
+def news_cache_key(label, sector, count):
+    """response_cache key: (label, sector, count, sources dropped last fetch)."""
+    status = fanout_status.get(sector, {})
+    dropped = tuple(sorted(status.get("timed_out", []) + status.get("failed", [])))
+    return (label, sector, count, dropped)
+
+
+def encode_news(key, label, sector, count, articles):
+    """Encode an /api/news payload once and keep it in response_cache."""
+    encoded = http_cache.encode({
+        "sector": label,
+        "count": len(articles),
+        "articles": articles,
+        "next_cursor": next_cursor(sector, articles, count),
+    })
+    return remember_news(key, sector, count, encoded)
+
+
+def encode_final_event(key, sector, count, articles):
+    """
+    Encode a warm sector's /api/news/stream response (its one "final"
+    event, as an NDJSON line) and keep it in response_cache.
+    """
+    encoded = http_cache.Encoded(serializer.dumps({
+        "event": "final",
+        "sector": sector,
+        "articles": articles,
+        "count": len(articles),
+        "next_cursor": next_cursor(sector, articles, count),
+    }) + b"\n")
+    return remember_news(key, sector, count, encoded)
+
+
+def finish_final_event(sector, count, event):
+    """Add the count and next_cursor to a stream's "final" event."""
+    event["count"] = len(event["articles"])
+    event["next_cursor"] = next_cursor(sector, event["articles"], count)
+    return event
+
+
+def remember_news(key, sector, count, encoded):
+    """Keep an encoded sector view in response_cache until its data changes."""
+    response_cache.put(
+        key, encoded,
+        depends_on=source_cache_keys(sector) + [("prewarm", sector)],
+        ttl=news_max_age(sector, count),
+    )
+    return encoded
+
+
+def news_page(label, sector, count, cursor):
+    """
+    /api/news payload for the page after cursor (a previous response's
+    next_cursor). Raises ValueError for a malformed cursor.
+    """
+    articles, next_page = get_news_page(sector, count, cursor)
+    return {
+        "sector": label,
+        "count": len(articles),
+        "articles": articles,
+        "next_cursor": next_page,
+    }
+
+
+def news_delta(sector, articles, sequence):
+    """/api/news/since payload; sequence is the client's next since."""
+    return {
+        "sector": sector,
+        "count": len(articles),
+        "articles": articles,
+        "sequence": sequence,
+    }
+
+
+def articles_event(sector, articles, sequence):
+    """An /api/news/events "articles" event, with the sequence as its id."""
+    data = serializer.dumps(news_delta(sector, articles, sequence))
+    return b"id: %d\nevent: articles\ndata: %s\n\n" % (sequence, data)
+
+
+def delta_count(value):
+    """A client's delta count, clamped to 1..MAX_DELTA."""
+    return min(max(value, 1), MAX_DELTA)
+
+
+def wait_seconds(value):
+    """A client's long-poll wait, capped at MAX_WAIT."""
+    return min(max(value or 0, 0), MAX_WAIT)
+
+
+def cached_json(payload, max_age=http_cache.DEFAULT_MAX_AGE):
+    """
+    JSON response with ETag/304, Cache-Control and compression.
+    payload may already be http_cache.Encoded.
+    """
+    if not isinstance(payload, http_cache.Encoded):
+        payload = http_cache.encode(payload)
+    status, headers, body = http_cache.respond(
+        payload,
+        if_none_match=request.headers.get("If-None-Match"),
+        accept_encoding=request.headers.get("Accept-Encoding"),
+        max_age=max_age,
+    )
+    return Response(body, status=status, headers=headers)
+
+
+def search_query(query, exact):
+    """Wrap an exact=true query in quotes so every source treats it as a phrase."""
+    if exact == "true" and '"' not in query:
+        return f'"{query}"'
+    return query
+
 
 @app.route("/")
 def home():
@@ -21,50 +185,142 @@ def get_news():
         sector = request.args.get("sector", None)
         category = request.args.get("category", None)
         count = request.args.get("count", 20, type=int)
+        cursor = request.args.get("cursor", None)
 
         # Support both sector (new) and category (legacy) params
-        if sector:
-            articles = get_all_news(sector=sector, count=count)
-        elif category:
-            # Map old category names to sectors for backward compatibility
-            category_to_sector = {
-                "general": "all",
-                "technology": "technology",
-                "business": "financial",
-                "health": "healthcare",
-                "science": "science",
-                "sports": "all",
-            }
-            mapped_sector = category_to_sector.get(category, "all")
-            articles = get_all_news(sector=mapped_sector, count=count)
-        else:
-            articles = get_all_news(sector="all", count=count)
-
-        return jsonify({
-            "sector": sector or category or "all",
-            "count": len(articles),
-            "articles": articles,
-        })
+        resolved = resolve_sector(sector, category)
+        label = sector or category or "all"
+
+        # Later pages are read from the article store, never fetched
+        if cursor:
+            try:
+                return cached_json(news_page(label, resolved, count, cursor))
+            except ValueError:
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        key = news_cache_key(label, resolved, count)
+        encoded = response_cache.get(key)
+        if encoded is None:
+            articles = get_warm_news(sector=resolved, count=count)
+            encoded = encode_news(key, label, resolved, count, articles)
+
+        return cached_json(encoded, max_age=news_max_age(resolved, count))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/news/stream")
+def stream_news():
+    """
+    Newline-delimited JSON: one "source" event per source as it finishes,
+    then a "final" event with the deduplicated, relevance-sorted list and
+    the next_cursor for /api/news's later pages. A warm sector is answered
+    with the final event straight away, cached and revalidated like
+    /api/news (ETag/304, Cache-Control, compression).
+    """
+    sector = request.args.get("sector", "all")
+    count = request.args.get("count", 20, type=int)
+
+    # The "stream" prefix keeps these apart from /api/news's entries
+    key = ("stream",) + news_cache_key(sector, sector, count)
+    encoded = response_cache.get(key)
+    if encoded is None:
+        warm = peek_warm_news(sector, count)
+        if warm is not None:
+            encoded = encode_final_event(key, sector, count, warm)
+    if encoded is not None:
+        response = cached_json(encoded, max_age=news_max_age(sector, count))
+        response.mimetype = "application/x-ndjson"
+        return response
+
+    def generate():
+        try:
+            for event in stream_all_news(sector=sector, count=count):
+                if event["event"] == "final":
+                    finish_final_event(sector, count, event)
+                yield serializer.dumps(event) + b"\n"
+        except Exception as e:
+            yield serializer.dumps({"event": "error", "error": str(e)}) + b"\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/news/since")
+def news_since():
+    """
+    Articles ingested after the client's last sync, for polling clients.
+    Pass the previous response's sequence as since; without since, only
+    the current sequence is returned. wait=N long-polls: the response is
+    held up to N seconds until something new arrives for the sector.
+    """
+    try:
+        sector = request.args.get("sector", "all")
+        since = request.args.get("since", None, type=int)
+        count = delta_count(request.args.get("count", 100, type=int))
+        wait = wait_seconds(request.args.get("wait", 0, type=float))
+
+        articles, sequence = get_news_since(sector, since, count, wait)
+        return cached_json(news_delta(sector, articles, sequence), max_age=0)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/news/events")
+def news_events():
+    """
+    Server-sent events: an "articles" event whenever articles for the
+    sector are ingested, with the sequence as its id, so a reconnecting
+    EventSource resumes from Last-Event-ID. A new subscriber starts at
+    since (or now, without it).
+    """
+    sector = request.args.get("sector", "all")
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", None, type=int)
+    count = delta_count(request.args.get("count", 100, type=int))
+
+    def generate():
+        sequence = since
+        if sequence is None:
+            sequence = get_news_since(sector)[1]
+        yield b"retry: 5000\n\n"
+        while True:
+            articles, sequence = get_news_since(sector, sequence, count, SSE_HEARTBEAT)
+            if not articles:
+                yield b": keep-alive\n\n"
+                continue
+            yield articles_event(sector, articles, sequence)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/api/news/search")
 def search_news():
     try:
         query = request.args.get("q", "")
         count = request.args.get("count", 20, type=int)
         exact = request.args.get("exact", "false")
+        remote = request.args.get("remote", "auto")
 
         if not query:
             return jsonify({"error": "Please provide a search query with ?q="}), 400
 
-        if exact == "true" and '"' not in query:
-            query = f'"{query}"'
+        query = search_query(query, exact)
 
-        articles = search_all_sources(query=query, count=count)
+        try:
+            articles = search_all_sources(query=query, count=count, remote=remote)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        return jsonify({
+        return cached_json({
             "query": query,
             "count": len(articles),
             "articles": articles,
@@ -72,6 +328,31 @@ def search_news():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+@app.route("/api/stats")
+def stats():
+    return jsonify({
+        "cache": cache_stats(),
+        "transport": transport_stats(),
+        "quota": quota_stats(),
+        "responses": response_cache.stats(),
+    })
+
+
+@app.route("/api/sources")
+def sources():
+    """
+    Health of each upstream source: circuit breaker state and latency
+    percentiles, the outcome of each RSS feed's last fetch, and the
+    sources each sector's last fan-out dropped (timed out or failed).
+    """
+    return jsonify({
+        "sources": breaker_stats(),
+        "feeds": feed_status,
+        "fanout": fanout_status,
+    })
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5001))
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,68 @@
+"""
+Compact article record.
+Fetchers clean every upstream article into an Article rather than a dict:
+it is a slotted dataclass, so there is no per-instance dict and orjson
+encodes it natively, and source names are interned, so the many articles
+from one source share a single string.
+Articles sit in every fetcher cache, the article store's read path and
+the search index, so the saving applies to each copy.
+Article supports the dict reads the rest of the code uses
+(article["title"], article.get("image")), so a plain dict (e.g. in a
+cache entry written before Article existed) can stand in for one.
+"""
+
+import sys
+from dataclasses import dataclass, fields
+
+
+@dataclass(slots=True, repr=False)
+class Article:
+    title: str = None
+    description: str = None
+    source: str = None
+    url: str = None
+    image: str = None
+    published: str = None
+    published_ts: float = None
+
+    def __post_init__(self):
+        if isinstance(self.source, str):
+            self.source = sys.intern(self.source)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data.get(field) for field in FIELDS})
+
+    def __getitem__(self, field):
+        if field not in _FIELD_SET:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def get(self, field, default=None):
+        return getattr(self, field) if field in _FIELD_SET else default
+
+    def __contains__(self, field):
+        return field in _FIELD_SET
+
+    def keys(self):
+        return FIELDS
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __repr__(self):
+        return f"Article(source={self.source!r}, title={self.title!r})"
+
+
+FIELDS = tuple(field.name for field in fields(Article))
+_FIELD_SET = frozenset(FIELDS)
+
+
+def to_json(value):
+    """
+    json.dumps default= hook for the stdlib encoder: serializes an
+    Article as an object (orjson does this itself).
+    """
+    if isinstance(value, Article):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,297 @@
+"""
+ASGI entry point for production serving:
+
+    cd backend
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+
+/api/news, /api/news/stream, /api/news/since, /api/news/events and
+/api/news/search run as async handlers: their upstream calls (and the
+long-polls and SSE subscriptions) run on the event loop, so one worker
+can hold hundreds of in-flight requests without a thread for each. Every other route (static files,
+stats) is passed to the Flask app through asgiref's WSGI adapter, which
+runs them one at a time on a single thread.
+"""
+
+import asyncio
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+from aggregator import get_news_since_async, search_all_sources_async, stream_all_news_async
+import http_cache
+import response_cache
+import serializer
+from app import (
+    SSE_HEARTBEAT, app as flask_app, articles_event, delta_count,
+    encode_final_event, encode_news, finish_final_event, news_cache_key,
+    news_delta, news_max_age, news_page, resolve_sector, search_query,
+    wait_seconds,
+)
+from transport import close_async_client
+from prewarm import get_warm_news_async, peek_warm_news
+
+_flask = WsgiToAsgi(flask_app)
+
+
+class Stream:
+    """A response body sent in chunks as an async iterator produces them."""
+
+    __slots__ = ("content_type", "chunks")
+
+    def __init__(self, content_type, chunks):
+        self.content_type = content_type
+        self.chunks = chunks
+
+
+async def get_news(args, headers):
+    sector = args.get("sector")
+    category = args.get("category")
+    count = _int(args.get("count"), 20)
+    cursor = args.get("cursor")
+
+    resolved = resolve_sector(sector, category)
+    label = sector or category or "all"
+
+    if cursor:
+        try:
+            payload = await asyncio.to_thread(news_page, label, resolved, count, cursor)
+            return 200, payload, http_cache.DEFAULT_MAX_AGE
+        except ValueError:
+            return 400, {"error": "Invalid cursor"}, None
+
+    key = news_cache_key(label, resolved, count)
+    encoded = response_cache.get(key)
+    if encoded is None:
+        articles = await get_warm_news_async(sector=resolved, count=count)
+        # next_cursor reads the store
+        encoded = await asyncio.to_thread(
+            encode_news, key, label, resolved, count, articles)
+
+    return 200, encoded, news_max_age(resolved, count)
+
+
+async def stream_news(args, headers):
+    sector = args.get("sector", "all")
+    count = _int(args.get("count"), 20)
+
+    # A warm sector is one cached "final" event, like app.stream_news
+    key = ("stream",) + news_cache_key(sector, sector, count)
+    encoded = response_cache.get(key)
+    if encoded is None:
+        warm = peek_warm_news(sector, count)
+        if warm is not None:
+            encoded = await asyncio.to_thread(
+                encode_final_event, key, sector, count, warm)
+    if encoded is not None:
+        return 200, encoded, news_max_age(sector, count)
+
+    return 200, Stream("application/x-ndjson", _news_events(sector, count)), None
+
+
+async def _news_events(sector, count):
+    try:
+        async for event in stream_all_news_async(sector=sector, count=count):
+            if event["event"] == "final":
+                await asyncio.to_thread(finish_final_event, sector, count, event)
+            yield serializer.dumps(event) + b"\n"
+    except Exception as e:
+        yield serializer.dumps({"event": "error", "error": str(e)}) + b"\n"
+
+
+async def news_since(args, headers):
+    sector = args.get("sector", "all")
+    since = _int(args.get("since"), None)
+    count = delta_count(_int(args.get("count"), 100))
+    wait = wait_seconds(_float(args.get("wait"), 0))
+
+    # A long-poll waits on the event loop, not in a thread
+    articles, sequence = await get_news_since_async(sector, since, count, wait)
+    return 200, news_delta(sector, articles, sequence), 0
+
+
+async def news_events(args, headers):
+    sector = args.get("sector", "all")
+    # A reconnecting EventSource resumes from its last event's id
+    since = _int(headers.get("last-event-id"), None)
+    if since is None:
+        since = _int(args.get("since"), None)
+    count = delta_count(_int(args.get("count"), 100))
+    return 200, Stream("text/event-stream", _articles_events(sector, since, count)), None
+
+
+async def _articles_events(sector, since, count):
+    """app.news_events' SSE stream, waiting on the event loop."""
+    sequence = since
+    if sequence is None:
+        sequence = (await get_news_since_async(sector))[1]
+    yield b"retry: 5000\n\n"
+    while True:
+        articles, sequence = await get_news_since_async(
+            sector, sequence, count, SSE_HEARTBEAT)
+        if not articles:
+            yield b": keep-alive\n\n"
+            continue
+        yield articles_event(sector, articles, sequence)
+
+
+async def search_news(args, headers):
+    query = args.get("q", "")
+    count = _int(args.get("count"), 20)
+    exact = args.get("exact", "false")
+    remote = args.get("remote", "auto")
+
+    if not query:
+        return 400, {"error": "Please provide a search query with ?q="}, None
+
+    query = search_query(query, exact)
+    try:
+        articles = await search_all_sources_async(
+            query=query, count=count, remote=remote)
+    except ValueError as e:
+        return 400, {"error": str(e)}, None
+
+    return 200, {
+        "query": query,
+        "count": len(articles),
+        "articles": articles,
+    }, http_cache.DEFAULT_MAX_AGE
+
+
+# Each handler returns (status, payload, browser max-age); the payload
+# may be http_cache.Encoded, or a Stream
+ROUTES = {
+    "/api/news": get_news,
+    "/api/news/stream": stream_news,
+    "/api/news/since": news_since,
+    "/api/news/events": news_events,
+    "/api/news/search": search_news,
+}
+
+# Content-Type of a route's cached (Encoded) responses, if not JSON
+CONTENT_TYPES = {
+    "/api/news/stream": "application/x-ndjson",
+}
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+
+    handler = ROUTES.get(scope["path"]) if scope["type"] == "http" else None
+    if handler is None or scope["method"] not in ("GET", "HEAD"):
+        await _flask(scope, receive, send)
+        return
+
+    args = {
+        key: values[0]
+        for key, values in parse_qs(scope["query_string"].decode("latin-1")).items()
+    }
+    request_headers = {
+        name.decode("latin-1").lower(): value.decode("latin-1")
+        for name, value in scope["headers"]
+    }
+    try:
+        status, payload, max_age = await handler(args, request_headers)
+    except Exception as e:
+        status, payload, max_age = 500, {"error": str(e)}, None
+
+    if isinstance(payload, Stream):
+        await _send_stream(scope, receive, send, payload)
+        return
+    if isinstance(payload, http_cache.Encoded):
+        status, headers, body = http_cache.respond(
+            payload,
+            if_none_match=request_headers.get("if-none-match"),
+            accept_encoding=request_headers.get("accept-encoding"),
+            max_age=max_age,
+        )
+        if scope["path"] in CONTENT_TYPES:
+            headers["Content-Type"] = CONTENT_TYPES[scope["path"]]
+    else:
+        status, headers, body = http_cache.render(
+            payload,
+            if_none_match=request_headers.get("if-none-match"),
+            accept_encoding=request_headers.get("accept-encoding"),
+            max_age=max_age,
+            status=status,
+        )
+    # Same policy as flask_cors's CORS(app) default
+    headers["Access-Control-Allow-Origin"] = "*"
+    headers["Content-Length"] = str(len(body))
+
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers.items()
+        ],
+    })
+    await send({
+        "type": "http.response.body",
+        "body": b"" if scope["method"] == "HEAD" else body,
+    })
+
+
+async def _send_stream(scope, receive, send, stream):
+    """Send each chunk as it is produced; stop if the client disconnects."""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", stream.content_type.encode("latin-1")),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+            (b"access-control-allow-origin", b"*"),
+        ],
+    })
+    chunks = stream.chunks
+    disconnected = asyncio.ensure_future(_disconnect(receive))
+    try:
+        while scope["method"] != "HEAD":
+            chunk = asyncio.ensure_future(chunks.__anext__())
+            await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not chunk.done():
+                # Gone: stop the producer (e.g. an SSE long-poll) now
+                chunk.cancel()
+                await asyncio.wait({chunk})
+                return
+            try:
+                body = chunk.result()
+            except StopAsyncIteration:
+                break
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        disconnected.cancel()
+        await chunks.aclose()
+
+
+async def _disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def _int(value, default):
+    """Parse an int query param like Flask's type=int: bad values use the default."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _float(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
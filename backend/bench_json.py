@@ -0,0 +1,80 @@
+"""
+Serializer throughput for /api/news-shaped payloads of 20, 100 and 1000
+articles: the stdlib json module (through article.to_json) against
+orjson (when installed; it encodes the Article dataclasses natively),
+plus the Flask provider jsonify uses.
+
+    cd backend
+    python bench_json.py
+"""
+
+import json
+import timeit
+from flask import Flask
+from article import Article, to_json
+import serializer
+
+SIZES = (20, 100, 1000)
+
+# Each measurement runs for at least this long (seconds)
+MIN_TIME = 0.5
+
+
+def make_payload(count):
+    sources = ("New York Times", "The Guardian", "Reuters", "TechCrunch")
+    articles = [
+        Article(
+            title=f"Article {i}: chipmakers expand capacity as demand for AI accelerators grows",
+            description=(
+                "Manufacturers announced new fabrication plants this week, citing "
+                "sustained orders from cloud providers and a shortage of advanced "
+                f"packaging capacity. ({i})"
+            ),
+            source=sources[i % len(sources)],
+            url=f"https://example.com/news/2026/10/article-{i}",
+            image=f"https://example.com/images/{i}.jpg" if i % 3 == 0 else None,
+            published="2026-10-18T09:30:00Z",
+            published_ts=1792315800 - i * 60,
+        )
+        for i in range(count)
+    ]
+    return {"sector": "technology", "count": count, "articles": articles}
+
+
+def serializers():
+    app = Flask(__name__)
+    provider = serializer.JSONProvider(app)
+    candidates = {
+        "stdlib json": lambda p: json.dumps(p, default=to_json).encode(),
+        "serializer.dumps": serializer.dumps,
+        "JSONProvider.dumps": lambda p: provider.dumps(p, separators=(",", ":")),
+    }
+    if serializer.orjson is None:
+        print("orjson is not installed: serializer falls back to stdlib json\n")
+    return candidates
+
+
+def measure(fn, payload):
+    """(calls per second, output bytes) for fn(payload)."""
+    timer = timeit.Timer(lambda: fn(payload))
+    calls, elapsed = timer.autorange()
+    while elapsed < MIN_TIME:
+        calls *= 2
+        elapsed = timer.timeit(calls)
+    return calls / elapsed, len(fn(payload))
+
+
+if __name__ == "__main__":
+    candidates = serializers()
+    for count in SIZES:
+        payload = make_payload(count)
+        print(f"=== {count} articles ===")
+        baseline = None
+        for name, fn in candidates.items():
+            rate, size = measure(fn, payload)
+            baseline = baseline or rate
+            print(
+                f"  {name:<20} {rate:>10,.0f} calls/s  "
+                f"{rate * size / 1e6:>8.1f} MB/s  x{rate / baseline:.1f}"
+            )
+        print()
@@ -0,0 +1,136 @@
+"""
+Per-source circuit breakers and adaptive timeouts.
+Every upstream (NewsAPI, NYT, Guardian, each RSS feed) gets a breaker.
+After FAILURE_THRESHOLD failures in a row it opens and calls fail fast
+instead of waiting out a timeout; after OPEN_SECONDS one probe call is let
+through (half-open) and its outcome closes or re-opens the circuit.
+Each source's timeout follows its own observed latency: a multiple of its
+recent p95, doubled after each consecutive failure, and never more than
+the caller's timeout.
+"""
+
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Consecutive failures that open a circuit, and how long it stays open
+FAILURE_THRESHOLD = 3
+OPEN_SECONDS = 30
+
+# Latencies (seconds) of recent successful calls kept per source
+LATENCY_WINDOW = 50
+
+# Adaptive timeout = p95 * TIMEOUT_MULTIPLIER, at least MIN_TIMEOUT.
+# Until MIN_SAMPLES calls have succeeded the caller's timeout is used.
+TIMEOUT_MULTIPLIER = 3
+MIN_TIMEOUT = 2
+MIN_SAMPLES = 5
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a source whose circuit is open."""
+
+    def __init__(self, source, retry_in):
+        super().__init__(f"{source} circuit open, retrying in {retry_in:.0f}s")
+        self.source = source
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(self, source):
+        self.source = source
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.calls = 0
+        self.rejected = 0
+        self.last_error = None
+        self._probing = False
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self.state == OPEN:
+                retry_in = self.opened_at + OPEN_SECONDS - time.time()
+                if retry_in > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.source, retry_in)
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                # One probe at a time; everyone else keeps failing fast
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.source, 0)
+                self._probing = True
+            self.calls += 1
+
+    def timeout(self, default):
+        """Timeout for the next call, capped at the caller's default."""
+        with self._lock:
+            if self.state == HALF_OPEN or len(self._latencies) < MIN_SAMPLES:
+                return default
+            adaptive = max(self._percentile(0.95) * TIMEOUT_MULTIPLIER, MIN_TIMEOUT)
+            return min(adaptive * 2 ** self.failures, default)
+
+    def record_success(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) or type(error).__name__
+            if self.state == HALF_OPEN or self.failures >= FAILURE_THRESHOLD:
+                if self.state != OPEN:
+                    print(f"  [BREAKER] {self.source} opened: {self.last_error}")
+                self.state = OPEN
+                self.opened_at = time.time()
+            self._probing = False
+
+    def _percentile(self, fraction):
+        ordered = sorted(self._latencies)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+    def stats(self):
+        with self._lock:
+            has_samples = bool(self._latencies)
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "retry_in": (
+                    round(max(self.opened_at + OPEN_SECONDS - time.time(), 0), 1)
+                    if self.state == OPEN else None
+                ),
+                "calls": self.calls,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+                "p50": round(self._percentile(0.5), 3) if has_samples else None,
+                "p95": round(self._percentile(0.95), 3) if has_samples else None,
+            }
+
+
+_breakers = {}
+_lock = threading.Lock()
+
+
+def get_breaker(source):
+    """Return the breaker for a source, creating it on first use."""
+    with _lock:
+        if source not in _breakers:
+            _breakers[source] = CircuitBreaker(source)
+        return _breakers[source]
+
+
+def breaker_stats():
+    """Breaker state and latency percentiles for every source (this process only)."""
+    return {source: b.stats() for source, b in _breakers.items()}
@@ -0,0 +1,318 @@
+"""
+Shared cache for all fetchers.
+Each fetcher asks for a namespace ("newsapi", "nyt", ...) with its own TTL.
+Entries live in one backend: an in-process LRU (default) or an on-disk
+SQLite store that every worker process on the host shares and that
+survives restarts. Pick it with CACHE_BACKEND=memory|sqlite.
+"""
+
+import asyncio
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_PATH = os.getenv(
+    "CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_cache.sqlite3"),
+)
+
+# Max entries held by the in-memory backend (across all namespaces)
+MEMORY_MAXSIZE = 500
+
+# Expired entries are kept this long so callers can still ask for stale data
+STALE_GRACE = 86400
+
+DEFAULT_TTL = 900
+
+# Per-namespace TTLs in seconds
+NAMESPACE_TTLS = {
+    "newsapi": 900,
+    "nyt": 900,
+    "guardian": 900,
+    "rss": 900,
+    "rss_feeds": 86400,
+}
+
+
+class MemoryBackend:
+    """In-process LRU store of (value, expires_at) pairs."""
+
+    def __init__(self, maxsize=MEMORY_MAXSIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+            return item
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+
+class SQLiteBackend:
+    """On-disk store shared by every process that opens the same file."""
+
+    PURGE_EVERY = 100
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, key, value, expires_at):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires_at),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute(
+                "DELETE FROM cache WHERE expires_at < ?",
+                (time.time() - STALE_GRACE,),
+            )
+        conn.commit()
+
+    def delete(self, key):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        conn.commit()
+
+    def clear(self, prefix=""):
+        conn = self._conn()
+        conn.execute(
+            "DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+        conn.commit()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one.
+    The first caller runs the function; callers arriving while it is in
+    flight wait and receive its result (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+        return call["result"]
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on one event loop. The first caller's
+    loader runs as a task; later callers await the same task. Waiters are
+    shielded from each other, so a cancelled request doesn't abort the
+    fetch the others are waiting on.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+
+class Cache:
+    """A namespaced view of the shared backend with hit/miss counters."""
+
+    def __init__(self, namespace, backend, ttl=DEFAULT_TTL):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._flight = SingleFlight()
+        self._async_flight = AsyncSingleFlight()
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key, default=None, stale=False):
+        """
+        Return the cached value, or default on a miss.
+        With stale=True an expired (but not yet purged) value is returned too.
+        """
+        item = self.backend.get(self._key(key))
+        if item is not None:
+            value, expires_at = item
+            if time.time() < expires_at:
+                self.hits += 1
+                return value
+            if stale:
+                self.stale_hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.backend.set(self._key(key), value, time.time() + ttl)
+        _notify(self.namespace, key)
+
+    def coalesce(self, key, loader):
+        """
+        Run loader() for a missed key, sharing one upstream call between
+        every thread that misses the same key at the same time.
+        """
+        return self._flight.do(key, loader)
+
+    async def coalesce_async(self, key, loader):
+        """coalesce() for the async fetchers: loader is a coroutine function."""
+        return await self._async_flight.do(key, loader)
+
+    def delete(self, key):
+        self.backend.delete(self._key(key))
+        _notify(self.namespace, key)
+
+    def clear(self):
+        self.backend.clear(f"{self.namespace}:")
+        _notify(self.namespace, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "coalesced": self._flight.coalesced + self._async_flight.coalesced,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+_backend = None
+_caches = {}
+_lock = threading.Lock()
+
+# Called as listener(namespace, key) after an entry is written or deleted
+# in this process; key is None when a whole namespace is cleared
+_listeners = []
+
+
+def on_change(listener):
+    """Register a listener for cache writes (see _listeners)."""
+    _listeners.append(listener)
+
+
+def _notify(namespace, key):
+    for listener in _listeners:
+        listener(namespace, key)
+
+
+def get_backend():
+    global _backend
+    with _lock:
+        if _backend is None:
+            if CACHE_BACKEND == "sqlite":
+                _backend = SQLiteBackend(CACHE_PATH)
+            else:
+                _backend = MemoryBackend()
+        return _backend
+
+
+def get_cache(namespace):
+    """Return the shared cache for a namespace, creating it on first use."""
+    backend = get_backend()
+    with _lock:
+        if namespace not in _caches:
+            ttl = NAMESPACE_TTLS.get(namespace, DEFAULT_TTL)
+            _caches[namespace] = Cache(namespace, backend, ttl)
+        return _caches[namespace]
+
+
+def page_covers(page, count):
+    """
+    True if a cached page can answer a request for count items: it was
+    fetched with a large enough page size, or the upstream ran out of
+    results before filling it.
+    """
+    return count <= page["page_size"] or len(page["articles"]) < page["page_size"]
+
+
+def cache_stats():
+    """Hit/miss counters for every namespace (this process only)."""
+    return {
+        "backend": CACHE_BACKEND,
+        "namespaces": {name: c.stats() for name, c in _caches.items()},
+    }
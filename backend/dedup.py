@@ -0,0 +1,152 @@
+"""
+Duplicate detection for merged article lists.
+Two articles are duplicates if their URLs are the same once tracking
+parameters and other noise are stripped, or if their title + description
+shingles are near-identical (MinHash signatures, bucketed with LSH so each
+new article is only compared against likely matches).
+"""
+
+import re
+import zlib
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the click and never change the page
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "cmpid",
+    "smid", "smtyp", "ref", "ref_src", "referrer", "src", "guccounter",
+    "ncid", "ito", "cmp", "partner", "taid", "mod", "rss",
+}
+TRACKING_PREFIXES = ("utm_", "at_", "__")
+
+# MinHash / LSH parameters: 32 hashes in 8 bands of 4 rows puts the
+# LSH candidate threshold around a Jaccard similarity of 0.6
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+
+# Estimated Jaccard similarity at which two stories count as the same
+SIMILARITY = 0.5
+
+# Words per shingle, and how much of the text is shingled
+SHINGLE_SIZE = 2
+MAX_TOKENS = 60
+
+# Each hash function is crc32 XOR a fixed mask, so signatures are
+# reproducible across processes and cheap to compute
+_MASKS = [zlib.crc32(f"minhash-{i}".encode()) for i in range(NUM_HASHES)]
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def canonical_url(url):
+    """Normalize a URL so tracking variants of the same link compare equal."""
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip("/") or "/"
+    # Scheme is dropped: http and https versions are the same article
+    return urlunsplit(("", host, path, urlencode(query), ""))
+
+
+def signature(article):
+    """MinHash signature over word shingles of the title and description."""
+    description = article.get("description") or ""
+    if description == "No description":
+        description = ""
+    return _signature(f"{article.get('title') or ''} {description}")
+
+
+# Cached articles are deduplicated again on every request; remember their
+# signatures instead of recomputing them
+@lru_cache(maxsize=4096)
+def _signature(text):
+    tokens = WORD_RE.findall(text.lower())[:MAX_TOKENS]
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = {" ".join(tokens)} if tokens else set()
+    else:
+        shingles = {
+            " ".join(tokens[i:i + SHINGLE_SIZE])
+            for i in range(len(tokens) - SHINGLE_SIZE + 1)
+        }
+    if not shingles:
+        return None
+
+    hashed = [zlib.crc32(s.encode()) for s in shingles]
+    return tuple(min(h ^ mask for h in hashed) for mask in _MASKS)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_HASHES
+
+
+class NearDuplicateIndex:
+    """LSH index of MinHash signatures."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._signatures = []
+
+    def find(self, sig):
+        """Return the id of an indexed near-duplicate of sig, or None."""
+        checked = set()
+        for band, key in self._band_keys(sig):
+            for doc_id in self._buckets.get((band, key), ()):
+                if doc_id in checked:
+                    continue
+                checked.add(doc_id)
+                if similarity(sig, self._signatures[doc_id]) >= SIMILARITY:
+                    return doc_id
+        return None
+
+    def add(self, sig):
+        doc_id = len(self._signatures)
+        self._signatures.append(sig)
+        for band, key in self._band_keys(sig):
+            self._buckets.setdefault((band, key), []).append(doc_id)
+        return doc_id
+
+    @staticmethod
+    def _band_keys(sig):
+        for band in range(BANDS):
+            yield band, sig[band * ROWS:(band + 1) * ROWS]
+
+
+def deduplicate(articles):
+    """
+    Drop duplicate articles, keeping the first of each group, so callers
+    control which source wins by the order they pass articles in.
+    """
+    seen_urls = set()
+    seen_titles = set()
+    index = NearDuplicateIndex()
+    unique = []
+    for article in articles:
+        title_key = (article.get("title") or "").lower().strip()[:60]
+        if not title_key or title_key in seen_titles:
+            continue
+
+        url = canonical_url(article.get("url"))
+        if url and url in seen_urls:
+            continue
+
+        sig = signature(article)
+        if sig is not None:
+            if index.find(sig) is not None:
+                continue
+            index.add(sig)
+
+        seen_titles.add(title_key)
+        if url:
+            seen_urls.add(url)
+        unique.append(article)
+    return unique
@@ -1,14 +1,27 @@
+import asyncio
 import requests
+import httpx
 import os
 from dotenv import load_dotenv
-from cachetools import TTLCache
+import store
+import quota
+import transport
+from breaker import CircuitOpenError
+from cache import get_cache, page_covers
+from article import Article
+from timestamps import to_epoch
 
 load_dotenv()
 
 API_KEY = os.getenv("GUARDIAN_API_KEY")
 BASE_URL = "https://content.guardianapis.com"
 
-cache = TTLCache(maxsize=20, ttl=900)
+cache = get_cache("guardian")
+
+# Smallest page requested upstream; the page is cached without the count
+# and smaller requests are served by slicing it. Guardian caps page-size at 200.
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
 
 # Maps MOREOVER sectors to Guardian section names
 SECTOR_TO_GUARDIAN = {
@@ -27,58 +40,145 @@ SECTOR_TO_GUARDIAN = {
 }
 
 
-def get_guardian_articles(sector=None, query=None, count=10):
+def cache_key_for(sector=None, query=None):
+    """The "guardian" cache key a sector view or search is stored under."""
     if query:
-        cache_key = f"guardian_search_{query}_{count}"
-    else:
-        cache_key = f"guardian_section_{sector}_{count}"
+        return f"guardian_search_{query}"
+    # Sectors that share a Guardian section share one cache entry
+    section = SECTOR_TO_GUARDIAN.get(sector) if sector else None
+    return f"guardian_section_{section or 'all'}"
 
-    if cache_key in cache:
+
+def get_guardian_articles(sector=None, query=None, count=10):
+    section = SECTOR_TO_GUARDIAN.get(sector) if sector else None
+    cache_key = cache_key_for(sector, query)
+
+    cached = cache.get(cache_key)
+    if cached is not None and page_covers(cached, count):
         print(f"  [CACHE HIT] {cache_key}")
-        return cache[cache_key]
+        return cached["articles"][:count]
+
+    page_size = min(max(count, PAGE_SIZE), MAX_PAGE_SIZE)
 
     try:
-        url = f"{BASE_URL}/search"
-        params = {
-            "api-key": API_KEY,
-            "page-size": count,
-            "show-fields": "headline,trailText,thumbnail",
-            "order-by": "relevance" if query else "newest",
-        }
-
-        if query:
-            params["q"] = query
-        elif sector and sector in SECTOR_TO_GUARDIAN:
-            params["section"] = SECTOR_TO_GUARDIAN[sector]
-
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        articles = data.get("response", {}).get("results", [])
-        cleaned = _clean_articles(articles)
-
-        cache[cache_key] = cleaned
-        print(f"  [CACHE MISS] {cache_key} — fetched from Guardian")
-        return cleaned
-
-    except requests.exceptions.RequestException as e:
+        # Concurrent misses for the same page share one upstream call
+        cleaned = cache.coalesce(
+            f"{cache_key}_{page_size}",
+            lambda: _fetch_page(cache_key, section, query, page_size),
+        )
+        return cleaned[:count]
+
+    except (requests.exceptions.RequestException, CircuitOpenError) as e:
         print(f"  [ERROR] Guardian fetch failed: {e}")
         return []
 
 
+async def get_guardian_articles_async(sector=None, query=None, count=10):
+    """get_guardian_articles for the async serving path; shares its cache."""
+    section = SECTOR_TO_GUARDIAN.get(sector) if sector else None
+    cache_key = cache_key_for(sector, query)
+
+    cached = cache.get(cache_key)
+    if cached is not None and page_covers(cached, count):
+        print(f"  [CACHE HIT] {cache_key}")
+        return cached["articles"][:count]
+
+    page_size = min(max(count, PAGE_SIZE), MAX_PAGE_SIZE)
+
+    try:
+        cleaned = await cache.coalesce_async(
+            f"{cache_key}_{page_size}",
+            lambda: _fetch_page_async(cache_key, section, query, page_size),
+        )
+        return cleaned[:count]
+
+    except (httpx.HTTPError, CircuitOpenError) as e:
+        print(f"  [ERROR] Guardian fetch failed: {e}")
+        return []
+
+
+def _fetch_page(cache_key, section, query, page_size):
+    fallback = quota.over_budget("Guardian", cache, cache_key, _entry_articles)
+    if fallback is not None:
+        return fallback
+    url, params = _page_request(section, query, page_size)
+    try:
+        response = transport.get(
+            url, params=params, timeout=10, source="Guardian",
+            retry_statuses=transport.SERVER_ERRORS)
+    except CircuitOpenError:
+        # The circuit failed it fast, so it used no quota
+        quota.refund("Guardian")
+        raise
+    return _save_page(cache_key, query, page_size, response)
+
+
+async def _fetch_page_async(cache_key, section, query, page_size):
+    fallback = quota.over_budget("Guardian", cache, cache_key, _entry_articles)
+    if fallback is not None:
+        return fallback
+    url, params = _page_request(section, query, page_size)
+    try:
+        response = await transport.get_async(
+            url, params=params, timeout=10, source="Guardian",
+            retry_statuses=transport.SERVER_ERRORS)
+    except CircuitOpenError:
+        # The circuit failed it fast, so it used no quota
+        quota.refund("Guardian")
+        raise
+    # Parsing and the store write stay off the event loop
+    return await asyncio.to_thread(_save_page, cache_key, query, page_size, response)
+
+
+def _entry_articles(entry):
+    """The articles of a page-sized cache entry."""
+    return entry["articles"]
+
+
+def _page_request(section, query, page_size):
+    url = f"{BASE_URL}/search"
+    params = {
+        "api-key": API_KEY,
+        "page-size": page_size,
+        "show-fields": "headline,trailText,thumbnail",
+        "order-by": "relevance" if query else "newest",
+    }
+
+    if query:
+        params["q"] = query
+    elif section:
+        params["section"] = section
+    return url, params
+
+
+def _save_page(cache_key, query, page_size, response):
+    """Clean, cache and ingest a Guardian response (requests or httpx)."""
+    quota.observe("Guardian", response)
+    response.raise_for_status()
+    data = response.json()
+
+    articles = data.get("response", {}).get("results", [])
+    cleaned = _clean_articles(articles)
+
+    cache.set(cache_key, {"page_size": page_size, "articles": cleaned})
+    store.ingest(cleaned, origin=store.SEARCH if query else store.FEED)
+    print(f"  [CACHE MISS] {cache_key} — fetched from Guardian")
+    return cleaned
+
+
 def _clean_articles(articles):
     cleaned = []
     for article in articles:
         fields = article.get("fields", {})
-        cleaned.append({
-            "title": fields.get("headline", article.get("webTitle", "No title")),
-            "description": fields.get("trailText", "No description"),
-            "source": "The Guardian",
-            "url": article.get("webUrl"),
-            "image": fields.get("thumbnail"),
-            "published": article.get("webPublicationDate"),
-        })
+        cleaned.append(Article(
+            title=fields.get("headline", article.get("webTitle", "No title")),
+            description=fields.get("trailText", "No description"),
+            source="The Guardian",
+            url=article.get("webUrl"),
+            image=fields.get("thumbnail"),
+            published=article.get("webPublicationDate"),
+            published_ts=to_epoch(article.get("webPublicationDate")),
+        ))
     return cleaned
 
 
@@ -1,59 +1,169 @@
+import asyncio
 import requests
+import httpx
 import os
 from dotenv import load_dotenv
-from cachetools import TTLCache
+import store
+import quota
+import transport
+from breaker import CircuitOpenError
+from cache import get_cache, page_covers
+from article import Article
+from timestamps import to_epoch
 
 load_dotenv()
-# Cache up to 20 results, each lasting 15 minutes (900 seconds)
-cache = TTLCache(maxsize=20, ttl=900)
+# Results last 15 minutes (900 seconds) in the shared "newsapi" namespace
+cache = get_cache("newsapi")
 
 API_KEY = os.getenv("NEWS_API_KEY")
 BASE_URL = "https://newsapi.org/v2"
 
+# Smallest page requested upstream; the page is cached without the count
+# and smaller requests are served by slicing it. NewsAPI caps pageSize at 100.
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def cache_key_for(category="general", country="us"):
+    """The "newsapi" cache key a category's headlines are stored under."""
+    return f"{category}_{country}"
+
 
 def get_top_headlines(category="general", country="us", count=5):
-    cache_key = f"{category}_{country}_{count}"
+    cache_key = cache_key_for(category, country)
+
+    cached = cache.get(cache_key)
+    if cached is not None and page_covers(cached, count):
+        print(f"  [CACHE HIT] {cache_key}")
+        return cached["articles"][:count]
+
+    page_size = min(max(count, PAGE_SIZE), MAX_PAGE_SIZE)
+
+    try:
+        # Concurrent misses for the same page share one upstream call
+        articles = cache.coalesce(
+            f"{cache_key}_{page_size}",
+            lambda: _fetch_headlines(cache_key, category, country, page_size),
+        )
+        return articles[:count]
 
-    if cache_key in cache:
+    except (requests.exceptions.RequestException, CircuitOpenError) as e:
+        print(f"  [ERROR] Failed to fetch news: {e}")
+        return []
+
+
+async def get_top_headlines_async(category="general", country="us", count=5):
+    """get_top_headlines for the async serving path; shares its cache."""
+    cache_key = cache_key_for(category, country)
+
+    cached = cache.get(cache_key)
+    if cached is not None and page_covers(cached, count):
         print(f"  [CACHE HIT] {cache_key}")
-        return cache[cache_key]
+        return cached["articles"][:count]
+
+    page_size = min(max(count, PAGE_SIZE), MAX_PAGE_SIZE)
 
     try:
-        url = f"{BASE_URL}/top-headlines"
-        params = {
-            "apiKey": API_KEY,
-            "category": category,
-            "country": country,
-            "pageSize": count
-        }
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        if data["status"] != "ok":
-            print("Error fetching news:", data.get("message"))
-            return []
-
-        cache[cache_key] = data["articles"]
-        print(f"  [CACHE MISS] {cache_key} — fetched from API")
-        return data["articles"]
-
-    except requests.exceptions.RequestException as e:
+        articles = await cache.coalesce_async(
+            f"{cache_key}_{page_size}",
+            lambda: _fetch_headlines_async(cache_key, category, country, page_size),
+        )
+        return articles[:count]
+
+    except (httpx.HTTPError, CircuitOpenError) as e:
         print(f"  [ERROR] Failed to fetch news: {e}")
         return []
 
 
+def _fetch_headlines(cache_key, category, country, page_size):
+    fallback = quota.over_budget("NewsAPI", cache, cache_key, _entry_articles)
+    if fallback is not None:
+        return fallback
+    url, params = _headlines_request(category, country, page_size)
+    try:
+        response = transport.get(
+            url, params=params, timeout=10, source="NewsAPI",
+            retry_statuses=transport.SERVER_ERRORS)
+    except CircuitOpenError:
+        # The circuit failed it fast, so it used no quota
+        quota.refund("NewsAPI")
+        raise
+    return _save_headlines(cache_key, page_size, response)
+
+
+async def _fetch_headlines_async(cache_key, category, country, page_size):
+    fallback = quota.over_budget("NewsAPI", cache, cache_key, _entry_articles)
+    if fallback is not None:
+        return fallback
+    url, params = _headlines_request(category, country, page_size)
+    try:
+        response = await transport.get_async(
+            url, params=params, timeout=10, source="NewsAPI",
+            retry_statuses=transport.SERVER_ERRORS)
+    except CircuitOpenError:
+        # The circuit failed it fast, so it used no quota
+        quota.refund("NewsAPI")
+        raise
+    # Parsing and the store write stay off the event loop
+    return await asyncio.to_thread(_save_headlines, cache_key, page_size, response)
+
+
+def _entry_articles(entry):
+    """The articles of a page-sized cache entry."""
+    return entry["articles"]
+
+
+def _headlines_request(category, country, page_size):
+    url = f"{BASE_URL}/top-headlines"
+    params = {
+        "apiKey": API_KEY,
+        "category": category,
+        "country": country,
+        "pageSize": page_size
+    }
+    return url, params
+
+
+def _save_headlines(cache_key, page_size, response):
+    """Cache and ingest a top-headlines response (requests or httpx)."""
+    quota.observe("NewsAPI", response)
+    response.raise_for_status()
+    data = response.json()
+
+    if data["status"] != "ok":
+        print("Error fetching news:", data.get("message"))
+        return []
+
+    # Cache the cleaned Articles, not the much larger raw API objects
+    cleaned = clean_articles(data["articles"])
+    cache.set(cache_key, {
+        "page_size": page_size,
+        "articles": cleaned,
+    })
+    store.ingest(cleaned)
+    print(f"  [CACHE MISS] {cache_key} — fetched from API")
+    return cleaned
+
+
 def clean_articles(articles):
+    """
+    NewsAPI articles as Articles. Already-clean Articles pass through, so
+    raw entries cached by older versions are cleaned on the way out.
+    """
     cleaned = []
     for article in articles:
-        cleaned.append({
-            "title": article.get("title", "No title"),
-            "description": article.get("description", "No description"),
-            "source": article["source"]["name"],
-            "url": article.get("url"),
-            "image": article.get("urlToImage"),
-            "published": article.get("publishedAt")
-        })
+        if isinstance(article, Article):
+            cleaned.append(article)
+            continue
+        cleaned.append(Article(
+            title=article.get("title", "No title"),
+            description=article.get("description", "No description"),
+            source=article["source"]["name"],
+            url=article.get("url"),
+            image=article.get("urlToImage"),
+            published=article.get("publishedAt"),
+            published_ts=to_epoch(article.get("publishedAt")),
+        ))
     return cleaned
 
 
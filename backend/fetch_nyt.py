@@ -1,14 +1,22 @@
+import asyncio
 import requests
+import httpx
 import os
 from dotenv import load_dotenv
-from cachetools import TTLCache
+import store
+import quota
+import transport
+from breaker import CircuitOpenError
+from cache import get_cache
+from article import Article
+from timestamps import to_epoch
 
 load_dotenv()
 
 API_KEY = os.getenv("NYT_API_KEY")
 BASE_URL = "https://api.nytimes.com/svc"
 
-cache = TTLCache(maxsize=20, ttl=900)
+cache = get_cache("nyt")
 
 # Maps MOREOVER sectors to NYT section names
 SECTOR_TO_NYT = {
@@ -26,48 +34,121 @@ SECTOR_TO_NYT = {
 }
 
 
-def get_nyt_articles(sector=None, query=None, count=10):
+def cache_key_for(sector=None, query=None):
+    """The "nyt" cache key a sector view or search is stored under."""
     if query:
-        cache_key = f"nyt_search_{query}_{count}"
-    else:
-        cache_key = f"nyt_section_{sector}_{count}"
+        return f"nyt_search_{query}"
+    # Sectors that share an NYT section share one cache entry
+    return f"nyt_section_{SECTOR_TO_NYT.get(sector, 'home')}"
 
-    if cache_key in cache:
+
+def get_nyt_articles(sector=None, query=None, count=10):
+    section = SECTOR_TO_NYT.get(sector, "home")
+    cache_key = cache_key_for(sector, query)
+
+    # Both endpoints return a whole page regardless of count, so the full
+    # cleaned page is cached and every count is served by slicing it
+    cached = cache.get(cache_key)
+    if cached is not None:
         print(f"  [CACHE HIT] {cache_key}")
-        return cache[cache_key]
+        return cached[:count]
 
     try:
-        if query:
-            url = f"{BASE_URL}/search/v2/articlesearch.json"
-            params = {
-                "api-key": API_KEY,
-                "q": query,
-                "sort": "relevance",
-            }
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            articles = data.get("response", {}).get("docs", [])[:count]
-            cleaned = _clean_search(articles)
-        else:
-            section = SECTOR_TO_NYT.get(sector, "home")
-            url = f"{BASE_URL}/topstories/v2/{section}.json"
-            params = {"api-key": API_KEY}
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            articles = data.get("results", [])[:count]
-            cleaned = _clean_topstories(articles)
-
-        cache[cache_key] = cleaned
-        print(f"  [CACHE MISS] {cache_key} — fetched from NYT")
-        return cleaned
-
-    except requests.exceptions.RequestException as e:
+        # Concurrent misses for the same key share one upstream call
+        cleaned = cache.coalesce(
+            cache_key, lambda: _fetch_page(cache_key, section, query))
+        return cleaned[:count]
+
+    except (requests.exceptions.RequestException, CircuitOpenError) as e:
         print(f"  [ERROR] NYT fetch failed: {e}")
         return []
 
 
+async def get_nyt_articles_async(sector=None, query=None, count=10):
+    """get_nyt_articles for the async serving path; shares its cache."""
+    section = SECTOR_TO_NYT.get(sector, "home")
+    cache_key = cache_key_for(sector, query)
+
+    cached = cache.get(cache_key)
+    if cached is not None:
+        print(f"  [CACHE HIT] {cache_key}")
+        return cached[:count]
+
+    try:
+        cleaned = await cache.coalesce_async(
+            cache_key, lambda: _fetch_page_async(cache_key, section, query))
+        return cleaned[:count]
+
+    except (httpx.HTTPError, CircuitOpenError) as e:
+        print(f"  [ERROR] NYT fetch failed: {e}")
+        return []
+
+
+def _fetch_page(cache_key, section, query):
+    fallback = quota.over_budget("NYT", cache, cache_key)
+    if fallback is not None:
+        return fallback
+    url, params = _page_request(section, query)
+    try:
+        response = transport.get(
+            url, params=params, timeout=10, source="NYT",
+            retry_statuses=transport.SERVER_ERRORS)
+    except CircuitOpenError:
+        # The circuit failed it fast, so it used no quota
+        quota.refund("NYT")
+        raise
+    return _save_page(cache_key, query, response)
+
+
+async def _fetch_page_async(cache_key, section, query):
+    fallback = quota.over_budget("NYT", cache, cache_key)
+    if fallback is not None:
+        return fallback
+    url, params = _page_request(section, query)
+    try:
+        response = await transport.get_async(
+            url, params=params, timeout=10, source="NYT",
+            retry_statuses=transport.SERVER_ERRORS)
+    except CircuitOpenError:
+        # The circuit failed it fast, so it used no quota
+        quota.refund("NYT")
+        raise
+    # Parsing and the store write stay off the event loop
+    return await asyncio.to_thread(_save_page, cache_key, query, response)
+
+
+def _page_request(section, query):
+    if query:
+        url = f"{BASE_URL}/search/v2/articlesearch.json"
+        params = {
+            "api-key": API_KEY,
+            "q": query,
+            "sort": "relevance",
+        }
+    else:
+        url = f"{BASE_URL}/topstories/v2/{section}.json"
+        params = {"api-key": API_KEY}
+    return url, params
+
+
+def _save_page(cache_key, query, response):
+    """Clean, cache and ingest an NYT response (requests or httpx)."""
+    quota.observe("NYT", response)
+    response.raise_for_status()
+    data = response.json()
+    if query:
+        articles = data.get("response", {}).get("docs", [])
+        cleaned = _clean_search(articles)
+    else:
+        articles = data.get("results", [])
+        cleaned = _clean_topstories(articles)
+
+    cache.set(cache_key, cleaned)
+    store.ingest(cleaned, origin=store.SEARCH if query else store.FEED)
+    print(f"  [CACHE MISS] {cache_key} — fetched from NYT")
+    return cleaned
+
+
 def _clean_topstories(articles):
     cleaned = []
     for article in articles:
@@ -81,14 +162,15 @@ def _clean_topstories(articles):
             if not image and multimedia:
                 image = multimedia[0].get("url")
 
-        cleaned.append({
-            "title": article.get("title", "No title"),
-            "description": article.get("abstract", "No description"),
-            "source": "New York Times",
-            "url": article.get("url"),
-            "image": image,
-            "published": article.get("published_date"),
-        })
+        cleaned.append(Article(
+            title=article.get("title", "No title"),
+            description=article.get("abstract", "No description"),
+            source="New York Times",
+            url=article.get("url"),
+            image=image,
+            published=article.get("published_date"),
+            published_ts=to_epoch(article.get("published_date")),
+        ))
     return cleaned
 
 
@@ -103,14 +185,15 @@ def _clean_search(articles):
                     image = f"https://www.nytimes.com/{media.get('url')}"
                     break
 
-        cleaned.append({
-            "title": article.get("headline", {}).get("main", "No title"),
-            "description": article.get("abstract", "No description"),
-            "source": "New York Times",
-            "url": article.get("web_url"),
-            "image": image,
-            "published": article.get("pub_date"),
-        })
+        cleaned.append(Article(
+            title=article.get("headline", {}).get("main", "No title"),
+            description=article.get("abstract", "No description"),
+            source="New York Times",
+            url=article.get("web_url"),
+            image=image,
+            published=article.get("pub_date"),
+            published_ts=to_epoch(article.get("pub_date")),
+        ))
     return cleaned
 
 
@@ -1,8 +1,35 @@
+import asyncio
 import re
+import time
 import feedparser
-from cachetools import TTLCache
+import store
+import transport
+from concurrent.futures import ThreadPoolExecutor, wait
+from cache import get_cache
+from article import Article
+from timestamps import entry_epoch
 
-cache = TTLCache(maxsize=50, ttl=900)
+cache = get_cache("rss")
+
+# Feeds are fetched in parallel, at most MAX_FEED_WORKERS at a time.
+# Each feed gets FEED_TIMEOUT seconds; the whole batch gets GLOBAL_TIMEOUT.
+# GLOBAL_TIMEOUT must stay well under aggregator.FANOUT_TIMEOUT (8s):
+# a slow feed should cost only its own articles, not make the whole RSS
+# job miss the fan-out deadline.
+MAX_FEED_WORKERS = 8
+FEED_TIMEOUT = 5
+GLOBAL_TIMEOUT = 6
+
+_executor = ThreadPoolExecutor(
+    max_workers=MAX_FEED_WORKERS, thread_name_prefix="rss")
+
+# Outcome of the last fetch of each feed, keyed by feed name
+feed_status = {}
+
+# ETag / Last-Modified validators and the cleaned entries they describe,
+# keyed by feed URL. Lets an unchanged feed answer with a 304 instead of
+# being downloaded and parsed again.
+validators = get_cache("rss_feeds")
 
 # Some RSS feeds block requests without a proper User-Agent
 HEADERS = {
@@ -70,46 +97,235 @@ RSS_FEEDS = {
 }
 
 
+def cache_key_for(sector=None):
+    """The "rss" cache key a sector's entries are stored under."""
+    return f"rss_{sector or 'all'}"
+
+
 def get_rss_articles(sector=None, count=10):
-    cache_key = f"rss_{sector or 'all'}_{count}"
+    # Every entry gathered for a sector is cached under one count-free key;
+    # each request slices the sorted list
+    cache_key = cache_key_for(sector)
+
+    cached = cache.get(cache_key)
+    if cached is not None:
+        print(f"  [CACHE HIT] {cache_key}")
+        return cached[:count]
+
+    # Concurrent misses for the same sector share one round of feed fetches
+    all_articles = cache.coalesce(
+        cache_key, lambda: _fetch_sector(cache_key, sector))
+    return all_articles[:count]
+
+
+async def get_rss_articles_async(sector=None, count=10):
+    """get_rss_articles for the async serving path; shares its cache."""
+    cache_key = cache_key_for(sector)
 
-    if cache_key in cache:
+    cached = cache.get(cache_key)
+    if cached is not None:
         print(f"  [CACHE HIT] {cache_key}")
-        return cache[cache_key]
+        return cached[:count]
 
+    all_articles = await cache.coalesce_async(
+        cache_key, lambda: _fetch_sector_async(cache_key, sector))
+    return all_articles[:count]
+
+
+def _fetch_sector(cache_key, sector):
+    all_articles, errors = fetch_feeds(_sector_feeds(sector))
+    return _save_sector(cache_key, all_articles, errors)
+
+
+async def _fetch_sector_async(cache_key, sector):
+    all_articles, errors = await fetch_feeds_async(_sector_feeds(sector))
+    return await asyncio.to_thread(_save_sector, cache_key, all_articles, errors)
+
+
+def _sector_feeds(sector):
     feeds = []
     if sector and sector in RSS_FEEDS:
         feeds = RSS_FEEDS[sector]
     else:
         for sector_feeds in RSS_FEEDS.values():
             feeds.extend(sector_feeds[:2])
+    return feeds
+
+
+def _save_sector(cache_key, all_articles, errors):
+    for error in errors:
+        print(f"  [ERROR] RSS failed for {error['feed']}: {error['error']}")
+
+    all_articles.sort(key=lambda x: x.get("published_ts") or 0, reverse=True)
+
+    cache.set(cache_key, all_articles)
+    print(
+        f"  [CACHE MISS] {cache_key} — fetched {len(all_articles)} articles")
+    return all_articles
 
-    all_articles = []
-    for feed_info in feeds:
+
+def fetch_feeds(feeds, timeout=None):
+    """
+    Fetch and parse feeds in parallel.
+    Returns (articles, errors): the articles from every feed that finished
+    inside the global timeout, and one dict per feed that failed or timed out.
+    """
+    timeout = GLOBAL_TIMEOUT if timeout is None else timeout
+    futures = [(feed_info, _executor.submit(_fetch_feed, feed_info))
+               for feed_info in feeds]
+    done, _ = wait([future for _, future in futures], timeout=timeout)
+
+    outcomes = []
+    for feed_info, future in futures:
+        if future not in done:
+            outcomes.append((feed_info, None, f"timed out after {timeout}s"))
+            continue
         try:
-            feed = feedparser.parse(feed_info["url"], request_headers=HEADERS)
-            for entry in feed.entries[:5]:
-                all_articles.append({
-                    "title": entry.get("title", "No title"),
-                    "description": _clean_html(
-                        entry.get("summary", entry.get(
-                            "description", "No description"))
-                    ),
-                    "source": feed_info["name"],
-                    "url": entry.get("link"),
-                    "image": _extract_image(entry),
-                    "published": entry.get("published", entry.get("updated", "")),
-                })
+            outcomes.append((feed_info, future.result(), None))
         except Exception as e:
-            print(f"  [ERROR] RSS failed for {feed_info['name']}: {e}")
+            outcomes.append((feed_info, None, str(e)))
+    return _collect(outcomes)
 
-    all_articles.sort(key=lambda x: x.get("published", ""), reverse=True)
-    result = all_articles[:count]
 
-    cache[cache_key] = result
-    print(
-        f"  [CACHE MISS] rss_{sector or 'all'} — fetched {len(result)} articles")
-    return result
+async def fetch_feeds_async(feeds, timeout=None):
+    """
+    fetch_feeds on the event loop: every feed is requested at once over
+    the shared async client (at most MAX_FEED_WORKERS in flight) under the
+    same global timeout. Returns (articles, errors).
+    """
+    timeout = GLOBAL_TIMEOUT if timeout is None else timeout
+    limit = asyncio.Semaphore(MAX_FEED_WORKERS)
+
+    async def fetch(feed_info):
+        async with limit:
+            return await _fetch_feed_async(feed_info)
+
+    tasks = [(feed_info, asyncio.ensure_future(fetch(feed_info)))
+             for feed_info in feeds]
+    if tasks:
+        await asyncio.wait([task for _, task in tasks], timeout=timeout)
+
+    outcomes = []
+    for feed_info, task in tasks:
+        if not task.done():
+            task.cancel()
+            outcomes.append((feed_info, None, f"timed out after {timeout}s"))
+        elif task.exception() is not None:
+            outcomes.append((feed_info, None, str(task.exception())))
+        else:
+            outcomes.append((feed_info, task.result(), None))
+    return _collect(outcomes)
+
+
+def _collect(outcomes):
+    """Merge (feed_info, articles, error) outcomes into (articles, errors)."""
+    articles = []
+    errors = []
+    for feed_info, feed_articles, error in outcomes:
+        if error is None:
+            articles.extend(feed_articles)
+            continue
+
+        errors.append({
+            "feed": feed_info["name"],
+            "url": feed_info["url"],
+            "error": error,
+        })
+        feed_status[feed_info["name"]] = {
+            "ok": False,
+            "error": error,
+            "checked": time.time(),
+        }
+    return articles, errors
+
+
+def _fetch_feed(feed_info):
+    """
+    Download one feed with a per-feed timeout and clean its entries.
+    Sends a conditional request when validators are known; a 304 reuses
+    the entries parsed last time without touching feedparser.
+    """
+    started = time.time()
+    headers, known = _conditional_headers(feed_info["url"])
+    response = transport.get(
+        feed_info["url"], headers=headers, timeout=FEED_TIMEOUT,
+        source=feed_info["name"])
+    return _read_feed(feed_info, known, response, started)
+
+
+async def _fetch_feed_async(feed_info):
+    started = time.time()
+    headers, known = _conditional_headers(feed_info["url"])
+    response = await transport.get_async(
+        feed_info["url"], headers=headers, timeout=FEED_TIMEOUT,
+        source=feed_info["name"])
+    # feedparser and the store write stay off the event loop
+    return await asyncio.to_thread(_read_feed, feed_info, known, response, started)
+
+
+def _conditional_headers(url):
+    """Request headers for a feed, plus the validators entry they came from."""
+    headers = dict(HEADERS)
+    known = validators.get(url, stale=True)
+    if known:
+        if known["etag"]:
+            headers["If-None-Match"] = known["etag"]
+        if known["modified"]:
+            headers["If-Modified-Since"] = known["modified"]
+    return headers, known
+
+
+def _read_feed(feed_info, known, response, started):
+    """Parse a feed response (requests or httpx) and record its status."""
+    url = feed_info["url"]
+    if response.status_code == 304 and known:
+        articles = known["articles"]
+        not_modified = True
+        validators.set(url, known)
+    else:
+        response.raise_for_status()
+        feed = feedparser.parse(response.content)
+        articles = _clean_entries(feed.entries[:5], feed_info)
+        not_modified = False
+        store.ingest(articles)
+
+        etag = response.headers.get("ETag")
+        modified = response.headers.get("Last-Modified")
+        if etag or modified:
+            validators.set(url, {
+                "etag": etag,
+                "modified": modified,
+                "articles": articles,
+            })
+        else:
+            validators.delete(url)
+
+    feed_status[feed_info["name"]] = {
+        "ok": True,
+        "articles": len(articles),
+        "not_modified": not_modified,
+        "elapsed": round(time.time() - started, 3),
+        "checked": time.time(),
+    }
+    return articles
+
+
+def _clean_entries(entries, feed_info):
+    cleaned = []
+    for entry in entries:
+        cleaned.append(Article(
+            title=entry.get("title", "No title"),
+            description=_clean_html(
+                entry.get("summary", entry.get(
+                    "description", "No description"))
+            ),
+            source=feed_info["name"],
+            url=entry.get("link"),
+            image=_extract_image(entry),
+            published=entry.get("published", entry.get("updated", "")),
+            published_ts=entry_epoch(entry),
+        ))
+    return cleaned
 
 
 def _clean_html(text):
@@ -0,0 +1,145 @@
+"""
+HTTP caching and compression for JSON API responses.
+Both serving paths (Flask in app.py, ASGI in asgi.py) render responses
+through render() (or respond() for a payload already encode()d, e.g. by
+response_cache), which adds a strong ETag, answers a matching
+If-None-Match with 304, sets Cache-Control from the data's remaining
+freshness, and compresses the body with brotli or gzip when the client
+accepts it.
+"""
+
+import gzip
+import hashlib
+import serializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Browser freshness (seconds) for responses not tied to a warm sector
+DEFAULT_MAX_AGE = 60
+
+# How long a browser may keep showing an expired response while it
+# revalidates in the background; matches the fetcher cache TTLs
+STALE_WHILE_REVALIDATE = 900
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+# Brotli's default (11) is too slow to run per response
+BROTLI_QUALITY = 5
+
+
+class Encoded:
+    """
+    A payload serialized once: the JSON body, its digest, and compressed
+    variants made on first use. Safe to cache and share between requests.
+    """
+
+    __slots__ = ("body", "digest", "_variants")
+
+    def __init__(self, body):
+        self.body = body
+        self.digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._variants = {}
+
+    def etag(self, encoding=None):
+        # A strong ETag names one exact byte sequence, so each encoding
+        # has its own
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def body_for(self, encoding=None):
+        """The body in a content coding (None = identity)."""
+        if encoding is None:
+            return self.body
+        if encoding not in self._variants:
+            self._variants[encoding] = compress(self.body, encoding)
+        return self._variants[encoding]
+
+
+def encode(payload):
+    """Serialize a payload once, for respond() or response_cache."""
+    return Encoded(serializer.dumps(payload))
+
+
+def render(payload, if_none_match=None, accept_encoding=None,
+           max_age=DEFAULT_MAX_AGE, status=200):
+    """
+    Serialize payload to JSON. Returns (status, headers, body).
+    Only 200 responses get caching headers; errors are never cached.
+    """
+    if status != 200:
+        return status, {"Content-Type": "application/json"}, serializer.dumps(payload)
+    return respond(encode(payload), if_none_match, accept_encoding, max_age)
+
+
+def respond(encoded, if_none_match=None, accept_encoding=None,
+            max_age=DEFAULT_MAX_AGE):
+    """
+    render() for an already Encoded payload. max_age=0 (e.g. for polled
+    endpoints) means revalidate every time: no-cache, ETag still applies.
+    """
+    encoding = None
+    if len(encoded.body) >= MIN_COMPRESS_SIZE:
+        encoding = negotiate_encoding(accept_encoding)
+    headers = {
+        "Content-Type": "application/json",
+        "ETag": encoded.etag(encoding),
+        "Cache-Control": (
+            f"public, max-age={max_age}, "
+            f"stale-while-revalidate={STALE_WHILE_REVALIDATE}"
+        ) if max_age else "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return 304, headers, b""
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return 200, headers, encoded.body_for(encoding)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    The br or gzip coding with the client's highest q-value (br wins ties),
+    or None if it accepts neither.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+
+    best, best_q = None, 0
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        q = accepted.get(coding, accepted.get("*", 0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def etag_matches(if_none_match, tag):
+    """If-None-Match uses weak comparison: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    return tag in (t[2:] if t.startswith("W/") else t for t in candidates)
@@ -0,0 +1,165 @@
+"""
+Background pre-warming for sector views.
+Rebuilds get_all_news for every sector on a schedule so /api/news only
+ever reads warm results. If a refresh fails, the last good result keeps
+being served (stale-while-revalidate).
+"""
+
+import threading
+import time
+import response_cache
+from aggregator import get_all_news, get_all_news_async, SECTOR_TO_NEWSAPI
+
+# Rebuild each sector once the 15 minute fetcher caches have expired,
+# so the background thread pays the cold-fetch cost instead of a user
+REFRESH_INTERVAL = 900
+
+# Pause between sector refreshes to spread upstream API calls out
+STAGGER = 5
+
+# Articles kept per sector; smaller requests are served by slicing
+PREWARM_COUNT = 50
+
+SECTORS = ["all"] + list(SECTOR_TO_NEWSAPI)
+
+# sector -> {"articles": [...], "refreshed": ts, "checked": ts, "error": str}
+_warm = {}
+_refreshing = set()
+_lock = threading.Lock()
+_stop = threading.Event()
+_thread = None
+
+
+def get_warm_news(sector, count=20):
+    """
+    Return the pre-warmed articles for a sector.
+    Unknown sectors and oversized counts fall through to get_all_news.
+    A missing entry is built inline once; an overdue one is served as-is
+    while a background refresh runs.
+    """
+    if sector not in SECTORS or count > PREWARM_COUNT:
+        return get_all_news(sector=sector, count=count)
+
+    entry = _warm.get(sector)
+    if entry is None:
+        entry = refresh_sector(sector)
+    elif time.time() - entry["checked"] > REFRESH_INTERVAL + STAGGER * len(SECTORS):
+        # The scheduler is behind (or not running): revalidate in background
+        _refresh_in_background(sector)
+
+    return entry["articles"][:count]
+
+
+async def get_warm_news_async(sector, count=20):
+    """
+    get_warm_news for the async serving path. A sector that isn't warm
+    yet is built on the event loop; overdue ones are still revalidated by
+    a background thread.
+    """
+    if sector not in SECTORS or count > PREWARM_COUNT:
+        return await get_all_news_async(sector=sector, count=count)
+
+    entry = _warm.get(sector)
+    if entry is None:
+        try:
+            articles = await get_all_news_async(sector=sector, count=PREWARM_COUNT)
+            error = None if articles else "no articles returned"
+        except Exception as e:
+            articles = []
+            error = str(e)
+        entry = _record(sector, articles, error)
+    elif time.time() - entry["checked"] > REFRESH_INTERVAL + STAGGER * len(SECTORS):
+        _refresh_in_background(sector)
+
+    return entry["articles"][:count]
+
+
+def peek_warm_news(sector, count=20):
+    """The pre-warmed articles for a sector, or None if it isn't warm yet."""
+    entry = _warm.get(sector) if count <= PREWARM_COUNT else None
+    return entry["articles"][:count] if entry else None
+
+
+def fresh_for(sector):
+    """
+    Seconds until a warm sector is due for its next refresh (0 if it is
+    overdue), or None if the sector isn't warm.
+    """
+    entry = _warm.get(sector)
+    if entry is None:
+        return None
+    return max(0, int(entry["checked"] + REFRESH_INTERVAL - time.time()))
+
+
+def refresh_sector(sector):
+    """Rebuild one sector. Keeps the previous result if the rebuild fails."""
+    with _lock:
+        _refreshing.add(sector)
+    try:
+        articles = get_all_news(sector=sector, count=PREWARM_COUNT)
+        error = None if articles else "no articles returned"
+    except Exception as e:
+        articles = []
+        error = str(e)
+    finally:
+        with _lock:
+            _refreshing.discard(sector)
+    return _record(sector, articles, error)
+
+
+def _record(sector, articles, error):
+    """Store a rebuilt sector, keeping the previous result on failure."""
+    now = time.time()
+    previous = _warm.get(sector)
+    if error and previous:
+        print(f"  [PREWARM] {sector} refresh failed, serving stale: {error}")
+        previous["checked"] = now
+        previous["error"] = error
+        return previous
+
+    entry = {
+        "articles": articles,
+        "refreshed": now,
+        "checked": now,
+        "error": error,
+    }
+    _warm[sector] = entry
+    response_cache.invalidate("prewarm", sector)
+    print(f"  [PREWARM] {sector} — {len(articles)} articles")
+    return entry
+
+
+def start_prewarmer():
+    """Start the background refresh thread (once per process)."""
+    global _thread
+    if _thread and _thread.is_alive():
+        return _thread
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="prewarm", daemon=True)
+    _thread.start()
+    return _thread
+
+
+def stop_prewarmer():
+    _stop.set()
+
+
+def _run():
+    while not _stop.is_set():
+        for sector in SECTORS:
+            entry = _warm.get(sector)
+            if entry and time.time() - entry["checked"] < REFRESH_INTERVAL:
+                continue
+            refresh_sector(sector)
+            if _stop.wait(STAGGER):
+                return
+        _stop.wait(STAGGER)
+
+
+def _refresh_in_background(sector):
+    with _lock:
+        if sector in _refreshing:
+            return
+        _refreshing.add(sector)
+    threading.Thread(
+        target=refresh_sector, args=(sector,), daemon=True).start()
@@ -0,0 +1,182 @@
+"""
+Client-side request budgets for the keyed APIs (NewsAPI, NYT, Guardian).
+Each key gets a token bucket per quota window (per minute, per day) that
+refills continuously at the published rate. Before an upstream call the
+fetcher asks decide() whether to call the API, serve its stale cache
+entry, or skip the source, so a traffic spike can't burn the daily quota.
+Buckets are resynced from X-RateLimit-Remaining-* response headers where
+the API sends them, and drained by a 429. A call that its circuit
+breaker fails fast never reaches the API, so its token is refunded.
+Budgets are per process; the response headers keep workers honest.
+"""
+
+import os
+import threading
+import time
+
+CALL = "call"
+STALE = "stale"
+SKIP = "skip"
+
+WINDOWS = {"minute": 60, "day": 86400}
+
+# Published limits per key (requests per window); None = no such limit.
+# Override with e.g. NYT_QUOTA_DAY=4000 for a paid key.
+QUOTAS = {
+    "NewsAPI": {"minute": None, "day": 100},
+    "NYT": {"minute": 5, "day": 500},
+    "Guardian": {"minute": 60, "day": 500},
+}
+
+# Below this share of the daily budget, refresh only keys that have no
+# stale entry to fall back on
+RESERVE = 0.2
+
+
+class TokenBucket:
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self):
+        self._refill()
+        return self.tokens
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def give_back(self):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def set_remaining(self, remaining):
+        self._refill()
+        self.tokens = min(float(remaining), self.capacity)
+
+
+class Budget:
+    def __init__(self, api, limits):
+        self.api = api
+        self.buckets = {
+            window: TokenBucket(limit, WINDOWS[window])
+            for window, limit in limits.items() if limit
+        }
+        self.calls = 0
+        self.stale = 0
+        self.skipped = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def decide(self, get_stale):
+        """
+        CALL (a token is taken), STALE or SKIP, plus the stale value.
+        get_stale() is only called when the budget can't cover a call.
+        """
+        with self._lock:
+            can_call = all(b.available() >= 1 for b in self.buckets.values())
+            day = self.buckets.get("day")
+            low = day is not None and day.available() < day.capacity * RESERVE
+
+        stale = get_stale() if (low or not can_call) else None
+        with self._lock:
+            if stale is not None:
+                self.stale += 1
+                decision = STALE
+            elif all(b.available() >= 1 for b in self.buckets.values()):
+                for bucket in self.buckets.values():
+                    bucket.take()
+                self.calls += 1
+                decision = CALL
+            else:
+                self.skipped += 1
+                decision = SKIP
+
+        if decision == STALE:
+            print(f"  [QUOTA] {self.api} over budget — serving stale")
+        elif decision == SKIP:
+            print(f"  [QUOTA] {self.api} budget spent — skipping")
+        return decision, stale
+
+    def refund(self):
+        """Return the tokens of a CALL that never reached the API."""
+        with self._lock:
+            for bucket in self.buckets.values():
+                bucket.give_back()
+            self.calls -= 1
+
+    def observe(self, response):
+        """Resync the buckets from an API response's rate-limit headers."""
+        with self._lock:
+            for window, bucket in self.buckets.items():
+                remaining = response.headers.get(f"X-RateLimit-Remaining-{window}")
+                if remaining is not None and remaining.isdigit():
+                    bucket.set_remaining(int(remaining))
+                elif response.status_code == 429:
+                    bucket.set_remaining(0)
+            if response.status_code == 429:
+                self.rate_limited += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "stale": self.stale,
+                "skipped": self.skipped,
+                "rate_limited": self.rate_limited,
+                "remaining": {
+                    window: {
+                        "tokens": int(bucket.available()),
+                        "limit": bucket.capacity,
+                    }
+                    for window, bucket in self.buckets.items()
+                },
+            }
+
+
+def _limits(api):
+    return {
+        window: int(os.getenv(f"{api.upper()}_QUOTA_{window.upper()}", limit or 0))
+        for window, limit in QUOTAS[api].items()
+    }
+
+
+_budgets = {api: Budget(api, _limits(api)) for api in QUOTAS}
+
+
+def decide(api, get_stale):
+    """Whether to call api now: (CALL | STALE | SKIP, stale value or None)."""
+    return _budgets[api].decide(get_stale)
+
+
+def over_budget(api, cache, key, extract=lambda entry: entry):
+    """
+    What a fetcher serves instead of calling api when its budget says not
+    to: extract(the stale cache entry for key), or [] to skip the source.
+    None means go ahead and call.
+    """
+    decision, stale = decide(api, lambda: cache.get(key, stale=True))
+    if decision == CALL:
+        return None
+    return extract(stale) if decision == STALE else []
+
+
+def refund(api):
+    """Undo a CALL whose request failed fast (e.g. its circuit was open)."""
+    _budgets[api].refund()
+
+
+def observe(api, response):
+    _budgets[api].observe(response)
+
+
+def quota_stats():
+    """Budget usage for every API key (this process only)."""
+    return {api: budget.stats() for api, budget in _budgets.items()}
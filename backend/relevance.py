@@ -4,6 +4,9 @@ Scores articles based on keyword matching and source trust.
 Designed to be upgraded with user preferences and AI scoring later.
 """
 
+import re
+from functools import lru_cache
+
 # ========== SECTOR KEYWORDS ==========
 # Each sector has "strong" keywords (very likely relevant) and
 # "moderate" keywords (somewhat relevant). Also "exclude" keywords
@@ -295,6 +298,152 @@ SOURCE_TRUST = {
 }
 
 
+# ========== SCORE WEIGHTS ==========
+# Weights are kept in hundredths so per-article and batch scoring both add
+# up exact integers and always agree.
+
+EXCLUDE_POINTS = -30
+STRONG_TITLE_POINTS = 40
+STRONG_TEXT_POINTS = 20
+MODERATE_TITLE_POINTS = 20
+MODERATE_TEXT_POINTS = 10
+TRUST_POINTS = 50  # trust (0.0 - 1.0) is worth up to half a point
+DEFAULT_TRUST = 0.3  # for sources with no weight in a sector
+
+
+def _trust_points(source, sector):
+    trust = SOURCE_TRUST.get(source, {}).get(sector, DEFAULT_TRUST)
+    return round(trust * TRUST_POINTS)
+
+
+# ========== KEYWORD MATCHING ==========
+# Keyword lists are compiled once at import. Keywords match on word
+# boundaries, so "ev" no longer matches "every" and "ai" no longer matches
+# "said"; a trailing "s" is allowed so "banks" still matches "bank".
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _ends_word(text, end):
+    """True if a keyword ending at `end` (plus an optional "s") ends a word."""
+    if end < len(text) and text[end] == "s":
+        end += 1
+    return end >= len(text) or not ("a" <= text[end] <= "z" or "0" <= text[end] <= "9")
+
+
+def _trie_pattern(words):
+    """Build a regex alternation for words, factored by common prefixes."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if "" in node:
+            pattern = f"(?:{pattern})?"
+        return pattern
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Finds which keywords occur in a text with one compiled regex pass."""
+
+    def __init__(self, keywords):
+        keywords = list(dict.fromkeys(keywords))
+        # The keywords are folded into a prefix trie so each word start is
+        # rejected after a character or two. The match is a lookahead, so
+        # keywords inside a longer one ("driving" in "self-driving") are
+        # still found, and optional branches are greedy, so at each word
+        # start the longest keyword wins.
+        self._regex = re.compile(
+            rf"(?<![a-z0-9])(?=({_trie_pattern(keywords)})(s?)(?![a-z0-9]))")
+        # The shorter keywords a match implies at the same start: always
+        # ("ai" for "ai model"), or only when the match took no plural "s"
+        # ("stock" for "stocks", but not for "stockss")
+        self._implied = {}
+        for longer in keywords:
+            always, singular = [longer], []
+            for keyword in keywords:
+                if (keyword != longer and longer.startswith(keyword)
+                        and _ends_word(longer, len(keyword))):
+                    (singular if longer == keyword + "s" else always).append(keyword)
+            self._implied[longer] = (tuple(always), tuple(always + singular))
+
+    def find(self, text):
+        """Return {keyword: end offset of its first match} for text."""
+        hits = {}
+        for match in self._regex.finditer(text):
+            longer, plural = match.groups()
+            start = match.start()
+            for keyword in self._implied[longer][0 if plural else 1]:
+                if keyword not in hits:
+                    hits[keyword] = start + len(keyword)
+        return hits
+
+
+def _sector_keywords(keywords):
+    return keywords.get("strong", []) + keywords.get("moderate", []) + keywords.get("exclude", [])
+
+
+# One matcher per sector, for scoring one sector (score_article), and one
+# over every sector's keywords, for scoring all of them (score_sectors)
+SECTOR_MATCHERS = {
+    sector: KeywordMatcher(_sector_keywords(keywords))
+    for sector, keywords in SECTOR_KEYWORDS.items()
+}
+ALL_SECTORS_MATCHER = KeywordMatcher(
+    [k for keywords in SECTOR_KEYWORDS.values() for k in _sector_keywords(keywords)]
+)
+
+
+def _sector_points():
+    """
+    sector -> {keyword: (points for a text match, points for a title match)}
+    over its exclude, strong and moderate lists, so scoring only visits the
+    handful of keywords an article matched.
+    """
+    table = {}
+    for sector, keywords in SECTOR_KEYWORDS.items():
+        points = table[sector] = {}
+        for kind, text_points, title_points in (
+            ("exclude", EXCLUDE_POINTS, EXCLUDE_POINTS),
+            ("strong", STRONG_TEXT_POINTS, STRONG_TITLE_POINTS),
+            ("moderate", MODERATE_TEXT_POINTS, MODERATE_TITLE_POINTS),
+        ):
+            for keyword in keywords.get(kind, []):
+                text, title = points.get(keyword, (0, 0))
+                points[keyword] = (text + text_points, title + title_points)
+    return table
+
+
+SECTOR_POINTS = _sector_points()
+
+# keyword -> [(sector, text points, title points)] for every sector using it
+KEYWORD_POINTS = {}
+for _sector, _points in SECTOR_POINTS.items():
+    for _keyword, (_text, _title) in _points.items():
+        KEYWORD_POINTS.setdefault(_keyword, []).append((_sector, _text, _title))
+
+# Trust points per sector for each weighted source, and for any other source
+SOURCE_POINTS = {
+    source: {sector: _trust_points(source, sector) for sector in SECTOR_KEYWORDS}
+    for source in SOURCE_TRUST
+}
+DEFAULT_POINTS = {sector: _trust_points(None, sector) for sector in SECTOR_KEYWORDS}
+
+# Recent scores, keyed by (title, description, source, sector): ranking
+# the same articles again doesn't match them again
+SCORE_CACHE_SIZE = 4096
+
+
 def score_article(article, sector):
     """
     Score an article's relevance to a sector.
@@ -304,64 +453,96 @@ def score_article(article, sector):
     if sector == "all" or sector not in SECTOR_KEYWORDS:
         return 1.0  # No filtering for "all" view
 
-    keywords = SECTOR_KEYWORDS[sector]
+    return _cached_score(
+        article.get("title"), article.get("description"), article.get("source", ""), sector)
+
+
+@lru_cache(maxsize=SCORE_CACHE_SIZE)
+def _cached_score(title, description, source, sector):
+    title, text = _article_text({"title": title, "description": description})
+    total = SOURCE_POINTS.get(source, DEFAULT_POINTS)[sector]
+    points = SECTOR_POINTS[sector]
+    # One pass over the text; a match ending inside the title is a title hit
+    for keyword, end in SECTOR_MATCHERS[sector].find(text).items():
+        text_points, title_points = points[keyword]
+        total += title_points if end <= len(title) else text_points
+    return _clamp(total)
+
+
+def score_sectors(article):
+    """
+    Score an article against every sector in one pass over its text.
+    Returns {sector: score} for every sector in SECTOR_KEYWORDS.
+    """
+    title, text = _article_text(article)
+    source = article.get("source", "")
+    totals = dict(SOURCE_POINTS.get(source, DEFAULT_POINTS))
+    # A match ending inside the title is a title hit
+    for keyword, end in ALL_SECTORS_MATCHER.find(text).items():
+        in_title = end <= len(title)
+        for sector, text_points, title_points in KEYWORD_POINTS[keyword]:
+            totals[sector] += title_points if in_title else text_points
+    return {sector: _clamp(total) for sector, total in totals.items()}
+
+
+def _article_text(article):
     title = (article.get("title") or "").lower()
     description = (article.get("description") or "").lower()
-    source = article.get("source", "")
-    text = f"{title} {description}"
+    return title, f"{title} {description}"
 
-    score = 0.0
 
-    # Check for exclusion keywords first
-    for keyword in keywords.get("exclude", []):
-        if keyword in text:
-            score -= 0.3
+def _clamp(points):
+    """Cap a sector's points to a score between 0 and 1."""
+    return max(0.0, min(1.0, points / 100))
 
-    # Strong keyword matches (in title = extra weight)
-    for keyword in keywords.get("strong", []):
-        if keyword in title:
-            score += 0.4
-        elif keyword in text:
-            score += 0.2
 
-    # Moderate keyword matches
-    for keyword in keywords.get("moderate", []):
-        if keyword in title:
-            score += 0.2
-        elif keyword in text:
-            score += 0.1
+# ========== BATCH SCORING ==========
+# For ingest, backfills and re-ranking. score_sectors already finds every
+# sector's keywords in one matcher pass, and splitting the text into
+# words is most of its cost, so a batch is scored article by article.
 
-    # Source trust bonus
-    source_weights = SOURCE_TRUST.get(source, {})
-    trust = source_weights.get(sector, 0.3)  # Default 0.3 for unknown sources
-    score += trust * 0.5
 
-    # Cap the score between 0 and 1
-    return max(0.0, min(1.0, score))
+def score_batch(articles):
+    """
+    Score many articles against every sector.
+    Returns one {sector: score} dict per article, identical to what
+    score_sectors returns for it.
+    """
+    return [score_sectors(article) for article in articles]
 
 
-def filter_articles(articles, sector, threshold=0.25):
+def filter_articles(articles, sector, threshold=0.25, scores=None):
     """
     Score and filter articles for a sector.
-    Returns articles sorted by relevance score (highest first).
+    Returns articles sorted by relevance score (highest first, newest
+    first among equal scores; newest first for "all").
     Articles below the threshold are removed.
+    `scores` may map article URLs to precomputed scores for this sector;
+    only articles missing from it are scored here.
     """
     if sector == "all":
-        return articles
+        return sorted(articles, key=_recency, reverse=True)
 
+    scores = scores or {}
     scored = []
     for article in articles:
-        article_score = score_article(article, sector)
+        article_score = scores.get(article.get("url"))
+        if article_score is None:
+            article_score = score_article(article, sector)
         if article_score >= threshold:
             scored.append((article_score, article))
 
-    # Sort by score descending
-    scored.sort(key=lambda x: x[0], reverse=True)
+    # Sort by score descending, then by recency
+    scored.sort(key=lambda x: (x[0], _recency(x[1])), reverse=True)
 
     # Return just the articles (without scores)
     return [article for score, article in scored]
 
 
+def _recency(article):
+    return article.get("published_ts") or 0
+
+
 if __name__ == "__main__":
     # Test with some sample articles
     test_articles = [
@@ -394,3 +575,11 @@ if __name__ == "__main__":
         s = score_article(a, "crypto")
         status = "✓" if s >= 0.25 else "✗"
         print(f"  {status} [{s:.2f}] {a['title'][:60]}")
+
+    print("\n=== Batch scoring ===")
+    batch = score_batch(test_articles)
+    same = all(
+        batch[i][sector] == score_article(a, sector)
+        for i, a in enumerate(test_articles) for sector in SECTOR_KEYWORDS
+    )
+    print(f"  {'✓' if same else '✗'} matches score_article")
@@ -0,0 +1,79 @@
+"""
+Final /api/news responses, already encoded.
+Entries are keyed by (label, sector, count, source availability) and hold
+the http_cache.Encoded body (JSON bytes, ETag digest, compressed variants),
+so a hot sector view is answered without deduplicating, scoring or
+serializing anything. An entry is dropped as soon as any source cache
+entry it was built from is written, when its sector is rebuilt by the
+prewarmer, or when its max-age runs out.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from cache import on_change
+
+MAXSIZE = 256
+
+_entries = OrderedDict()
+# (namespace, key) of a source cache entry -> response keys built from it
+_dependents = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def get(key):
+    """The cached Encoded response for key, or None."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and time.time() < entry["expires_at"]:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return entry["encoded"]
+        _stats["misses"] += 1
+        return None
+
+
+def put(key, encoded, depends_on, ttl):
+    """Cache an encoded response built from the given source cache entries."""
+    if ttl <= 0:
+        return
+    with _lock:
+        _entries[key] = {
+            "encoded": encoded,
+            "depends_on": list(depends_on),
+            "expires_at": time.time() + ttl,
+        }
+        _entries.move_to_end(key)
+        for dependency in depends_on:
+            _dependents.setdefault(dependency, set()).add(key)
+        while len(_entries) > MAXSIZE:
+            old_key, _ = _entries.popitem(last=False)
+            _forget(old_key)
+
+
+def invalidate(namespace, key=None):
+    """Drop every response built from a source entry (or a whole namespace)."""
+    with _lock:
+        if key is None:
+            dependencies = [d for d in _dependents if d[0] == namespace]
+        else:
+            dependencies = [(namespace, key)]
+        for dependency in dependencies:
+            for response_key in _dependents.pop(dependency, ()):
+                if _entries.pop(response_key, None) is not None:
+                    _stats["invalidations"] += 1
+
+
+def _forget(response_key):
+    for dependents in _dependents.values():
+        dependents.discard(response_key)
+
+
+def stats():
+    with _lock:
+        return {"entries": len(_entries), **_stats}
+
+
+# Source caches notify us of every write in this process
+on_change(invalidate)
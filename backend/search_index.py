@@ -0,0 +1,173 @@
+"""
+Local full-text search over every article in the store.
+An in-memory inverted index (title + description) ranked with BM25.
+Quoted parts of a query ("like this") must appear as an exact phrase,
+matching how the NYT and Guardian APIs treat exact=true searches.
+The index catches up with the store by ingestion id before each search,
+so articles ingested by other worker processes show up too, and drops
+articles the store has pruned.
+"""
+
+import math
+import re
+import threading
+from collections import defaultdict
+import store
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# A title hit counts this many times a description hit
+TITLE_WEIGHT = 2
+
+# Position gap between title and description so phrases can't span both
+FIELD_GAP = 1000
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[&'][a-z0-9]+)*")
+PHRASE_RE = re.compile(r'"([^"]+)"')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        # term -> {doc_id: [positions]}
+        self._postings = defaultdict(dict)
+        # doc_id -> (article, weighted length)
+        self._docs = {}
+        self._total_length = 0
+        self._doc_ids = {}
+        # doc_id -> store id, for dropping pruned articles
+        self._store_ids = {}
+        self._next_id = 0
+        self.last_store_id = 0
+        # Every indexed article has a store id at or above this
+        self.first_store_id = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, article, store_id=0):
+        """Index an article; articles already indexed (by URL) are skipped."""
+        url = article.get("url")
+        with self._lock:
+            if not url or url in self._doc_ids:
+                return
+            doc_id = self._next_id
+            self._next_id += 1
+            self._doc_ids[url] = doc_id
+            self._store_ids[doc_id] = store_id
+
+            title = tokenize(article.get("title"))
+            description = tokenize(article.get("description"))
+            for position, term in enumerate(title):
+                self._postings[term].setdefault(doc_id, []).append(position)
+            for position, term in enumerate(description, FIELD_GAP):
+                self._postings[term].setdefault(doc_id, []).append(position)
+
+            length = len(title) * TITLE_WEIGHT + len(description)
+            self._docs[doc_id] = (article, length)
+            self._total_length += length
+
+    def drop_before(self, store_id):
+        """Remove every article whose store id is below store_id."""
+        with self._lock:
+            dropped = [d for d, s in self._store_ids.items() if s < store_id]
+            for doc_id in dropped:
+                self._remove(doc_id)
+            self.first_store_id = max(self.first_store_id, store_id)
+        return len(dropped)
+
+    def _remove(self, doc_id):
+        article, length = self._docs.pop(doc_id)
+        del self._store_ids[doc_id]
+        del self._doc_ids[article.get("url")]
+        self._total_length -= length
+        terms = tokenize(article.get("title")) + tokenize(article.get("description"))
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query, limit=20):
+        """Return up to `limit` articles ranked by BM25."""
+        phrases = [tokenize(p) for p in PHRASE_RE.findall(query)]
+        phrases = [p for p in phrases if p]
+        terms = tokenize(PHRASE_RE.sub(" ", query))
+        for phrase in phrases:
+            terms.extend(phrase)
+        terms = list(dict.fromkeys(terms))
+        if not terms:
+            return []
+
+        with self._lock:
+            candidates = None
+            for phrase in phrases:
+                matches = self._phrase_matches(phrase)
+                candidates = matches if candidates is None else candidates & matches
+
+            scores = self._bm25(terms, candidates)
+            ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+            return [self._docs[doc_id][0] for doc_id, _ in ranked[:limit]]
+
+    def _bm25(self, terms, candidates):
+        n_docs = len(self._docs)
+        avg_length = self._total_length / n_docs if n_docs else 0
+        scores = defaultdict(float)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, positions in postings.items():
+                if candidates is not None and doc_id not in candidates:
+                    continue
+                tf = sum(TITLE_WEIGHT if p < FIELD_GAP else 1 for p in positions)
+                length = self._docs[doc_id][1]
+                norm = K1 * (1 - B + B * length / avg_length) if avg_length else K1
+                scores[doc_id] += idf * tf * (K1 + 1) / (tf + norm)
+        return scores
+
+    def _phrase_matches(self, phrase):
+        """Doc ids containing the phrase's terms at consecutive positions."""
+        first = self._postings.get(phrase[0], {})
+        matches = set()
+        for doc_id, positions in first.items():
+            for start in positions:
+                if all(
+                    start + offset in self._postings.get(term, {}).get(doc_id, ())
+                    for offset, term in enumerate(phrase[1:], 1)
+                ):
+                    matches.add(doc_id)
+                    break
+        return matches
+
+
+index = SearchIndex()
+_sync_lock = threading.Lock()
+
+
+def sync():
+    """
+    Index every article ingested into the store since the last sync and
+    drop those it has pruned since.
+    """
+    with _sync_lock:
+        oldest = store.oldest_id()
+        if oldest > index.first_store_id:
+            index.drop_before(oldest)
+        for store_id, article in store.articles_after(index.last_store_id):
+            index.add(article, store_id)
+            index.last_store_id = store_id
+
+
+def search(query, limit=20):
+    sync()
+    return index.search(query, limit)
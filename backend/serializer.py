@@ -0,0 +1,69 @@
+"""
+JSON serialization for API responses.
+Uses orjson when it is installed (several times faster than the stdlib
+encoder on article lists) and falls back to the stdlib json module
+otherwise. orjson encodes Articles natively as dataclasses; the stdlib
+encoder goes through article.to_json. The Flask app's jsonify
+goes through JSONProvider, and http_cache and the streaming routes call
+dumps(), so every response is serialized here.
+Run bench_json.py to compare the backends.
+"""
+
+import json
+from flask.json.provider import DefaultJSONProvider
+from article import to_json
+
+try:
+    import orjson
+except ImportError:  # stdlib json is used instead
+    orjson = None
+
+
+def dumps(payload):
+    """Compact JSON bytes for a payload."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=to_json, separators=(",", ":")).encode()
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    Flask's JSON provider with orjson as the encoder when available.
+    Options orjson can't honour (e.g. a custom cls) fall back to Flask's
+    stdlib encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        # jsonify passes indent (debug) or compact separators; orjson
+        # output is always compact and can only indent by 2
+        indent = kwargs.get("indent")
+        other = set(kwargs) - {"indent", "separators"}
+        if orjson is None or other or indent not in (None, 2):
+            kwargs.setdefault("default", _default)
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def _default(value):
+    """Articles as objects, then whatever Flask's encoder handles (dates, UUIDs...)."""
+    try:
+        return to_json(value)
+    except TypeError:
+        return DefaultJSONProvider.default(value)
@@ -0,0 +1,434 @@
+"""
+Persistent article store.
+Fetchers ingest every article they download into a local SQLite database,
+deduplicated by URL. Each new article's score vector (one score per sector,
+computed in a batch by relevance.score_batch) is stored alongside it.
+Sector views can then be answered with an indexed query instead of
+re-fetching and re-scoring.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from article import FIELDS, Article
+from relevance import SECTOR_KEYWORDS, score_batch
+from timestamps import to_epoch
+
+STORE_PATH = os.getenv(
+    "STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "articles.sqlite3"),
+)
+
+# A sector whose sources were fetched this recently is served from the store
+STORE_TTL = 900
+
+# Articles older than this are pruned
+RETENTION_DAYS = 30
+PRUNE_EVERY = 200
+
+# Same cut-off filter_articles uses
+THRESHOLD = 0.25
+
+# Sector streams (views, cursor pages, deltas) only carry articles
+# published this recently (seconds); an undated article counts from when
+# it was ingested. Older articles stay in the store for search.
+SECTOR_WINDOW = 72 * 3600
+
+# Where an article was ingested from. Search results can be years old and
+# off-topic for any feed, so only FEED articles appear in sector streams;
+# a search article that later shows up in a feed is promoted.
+FEED = "feed"
+SEARCH = "search"
+
+# Waiters for new articles (long-poll, SSE) are woken by ingest() in this
+# process and re-check the database this often (seconds) for ingests by
+# other worker processes
+POLL_INTERVAL = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    description TEXT,
+    source TEXT,
+    image TEXT,
+    published TEXT,
+    published_ts INTEGER NOT NULL DEFAULT 0,
+    origin TEXT NOT NULL DEFAULT 'feed',
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_source ON articles (source);
+
+CREATE TABLE IF NOT EXISTS article_sectors (
+    sector TEXT NOT NULL,
+    article_id INTEGER NOT NULL REFERENCES articles (id) ON DELETE CASCADE,
+    score REAL NOT NULL,
+    PRIMARY KEY (sector, article_id)
+);
+CREATE INDEX IF NOT EXISTS idx_sectors_score ON article_sectors (sector, score);
+
+CREATE TABLE IF NOT EXISTS sector_refreshes (
+    sector TEXT PRIMARY KEY,
+    refreshed_at REAL NOT NULL
+);
+"""
+
+_local = threading.local()
+_ingests = 0
+_arrived = threading.Condition()
+
+
+def _conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(STORE_PATH, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(SCHEMA)
+        _migrate(conn)
+        _local.conn = conn
+    return conn
+
+
+def _migrate(conn):
+    """
+    Bring a store created by an older version up to SCHEMA: add
+    published_ts (backfilled from the published strings) and its index,
+    and origin (existing articles are taken to be feed articles).
+    """
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(articles)")}
+    with conn:
+        if "published_ts" not in columns:
+            conn.execute(
+                "ALTER TABLE articles ADD COLUMN published_ts INTEGER NOT NULL DEFAULT 0")
+            rows = conn.execute(
+                "SELECT id, published FROM articles WHERE published IS NOT NULL"
+            ).fetchall()
+            conn.executemany(
+                "UPDATE articles SET published_ts = ? WHERE id = ?",
+                [(to_epoch(row["published"]) or 0, row["id"]) for row in rows],
+            )
+        if "origin" not in columns:
+            conn.execute(
+                "ALTER TABLE articles ADD COLUMN origin TEXT NOT NULL DEFAULT 'feed'")
+        conn.execute("DROP INDEX IF EXISTS idx_articles_published")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_articles_published_ts"
+            " ON articles (published_ts, url)")
+
+
+def ingest(articles, origin=FEED):
+    """
+    Insert articles not seen before (by URL) and score them for every sector.
+    origin is FEED for sector feeds and SEARCH for search results.
+    Returns the number of new articles.
+    """
+    global _ingests
+    now = time.time()
+    new = []
+    seen = []
+    try:
+        conn = _conn()
+        with conn:
+            for article in articles:
+                url = article.get("url")
+                if not url:
+                    continue
+                cursor = conn.execute(
+                    "INSERT INTO articles"
+                    " (url, title, description, source, image, published,"
+                    " published_ts, origin, ingested_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (url) DO NOTHING",
+                    (url, article.get("title"), article.get("description"),
+                     article.get("source"), article.get("image"),
+                     article.get("published"), _published_ts(article), origin, now),
+                )
+                if cursor.rowcount:
+                    new.append((cursor.lastrowid, article))
+                else:
+                    seen.append((url,))
+
+            if origin == FEED and seen:
+                conn.executemany(
+                    "UPDATE articles SET origin = 'feed'"
+                    " WHERE url = ? AND origin = 'search'",
+                    seen,
+                )
+
+            vectors = score_batch([article for _, article in new])
+            conn.executemany(
+                "INSERT INTO article_sectors (sector, article_id, score)"
+                " VALUES (?, ?, ?)",
+                [(sector, article_id, score)
+                 for (article_id, _), vector in zip(new, vectors)
+                 for sector, score in vector.items()],
+            )
+    except sqlite3.Error as e:
+        # The store is an optimization; never fail a fetch because of it
+        print(f"  [ERROR] Store ingest failed: {e}")
+        return 0
+
+    if new:
+        with _arrived:
+            _arrived.notify_all()
+    _ingests += 1
+    if _ingests % PRUNE_EVERY == 0:
+        try:
+            prune()
+        except sqlite3.Error as e:
+            # e.g. "database is locked"; the next round prunes instead
+            print(f"  [ERROR] Store prune failed: {e}")
+    return len(new)
+
+
+def rescore(batch_size=1000):
+    """
+    Recompute every stored score vector, e.g. after keyword tables change.
+    Articles are scored in batches with relevance.score_batch.
+    Returns the number of articles rescored.
+    """
+    conn = _conn()
+    last_id = 0
+    total = 0
+    while True:
+        rows = conn.execute(
+            "SELECT * FROM articles WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            return total
+        vectors = score_batch([_to_article(row) for row in rows])
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO article_sectors (sector, article_id, score)"
+                " VALUES (?, ?, ?)",
+                [(sector, row["id"], score)
+                 for row, vector in zip(rows, vectors)
+                 for sector, score in vector.items()],
+            )
+        last_id = rows[-1]["id"]
+        total += len(rows)
+
+
+def sector_articles(sector, limit=20, threshold=THRESHOLD):
+    """
+    Articles for a sector, best score first (newest first for "all").
+    """
+    return [article for _, article in sector_page(sector, limit, threshold=threshold)]
+
+
+def sector_page(sector, limit=20, after=None, threshold=THRESHOLD):
+    """
+    One page of a sector's ranked stream as (key, article) pairs.
+    The stream is ordered by key = (score, published_ts, url), descending;
+    "all" ranks every article with score 0, so it runs newest first. A
+    sector without a keyword table (e.g. science) has no stored scores,
+    so its stream is empty and its views come from the fan-out. Only feed
+    articles inside SECTOR_WINDOW are in the stream. Pass a previous
+    page's last key as `after` to get the page that follows it.
+    """
+    window, params = _in_window()
+    if sector == "all":
+        sql = f"SELECT 0.0 AS score, a.* FROM articles a WHERE {window}"
+        if after is not None:
+            sql += " AND (a.published_ts, a.url) < (?, ?)"
+            params += [after[1], after[2]]
+        sql += " ORDER BY a.published_ts DESC, a.url DESC LIMIT ?"
+    else:
+        sql = (
+            "SELECT s.score AS score, a.*"
+            " FROM article_sectors s JOIN articles a ON a.id = s.article_id"
+            f" WHERE s.sector = ? AND s.score >= ? AND {window}"
+        )
+        params = [sector, threshold] + params
+        if after is not None:
+            sql += " AND (s.score, a.published_ts, a.url) < (?, ?, ?)"
+            params += list(after)
+        sql += " ORDER BY s.score DESC, a.published_ts DESC, a.url DESC LIMIT ?"
+    params.append(limit)
+
+    rows = _conn().execute(sql, params)
+    return [
+        ((row["score"], row["published_ts"], row["url"]), _to_article(row))
+        for row in rows
+    ]
+
+
+def articles_after(after_id=0):
+    """(id, article) pairs ingested after the given id, oldest first."""
+    try:
+        rows = _conn().execute(
+            "SELECT * FROM articles WHERE id > ? ORDER BY id", (after_id,)
+        ).fetchall()
+    except sqlite3.Error as e:
+        print(f"  [ERROR] Store lookup failed: {e}")
+        return []
+    return [(row["id"], _to_article(row)) for row in rows]
+
+
+def latest_id():
+    """Id of the newest stored article (0 if none): the store's sequence number."""
+    try:
+        row = _conn().execute("SELECT COALESCE(MAX(id), 0) FROM articles").fetchone()
+    except sqlite3.Error as e:
+        print(f"  [ERROR] Store lookup failed: {e}")
+        return 0
+    return row[0]
+
+
+def oldest_id():
+    """
+    Id of the oldest stored article. prune() drops the oldest ingests, so
+    every id below this one is gone; if the store has been emptied this is
+    one past the last id assigned. 0 if the store can't be read.
+    """
+    try:
+        row = _conn().execute(
+            "SELECT COALESCE(MIN(id), (SELECT seq + 1 FROM sqlite_sequence"
+            " WHERE name = 'articles'), 0) FROM articles"
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"  [ERROR] Store lookup failed: {e}")
+        return 0
+    return row[0]
+
+
+def sector_since(sector, since, limit=100, threshold=THRESHOLD):
+    """
+    A sector's articles ingested after id `since`, oldest first, plus the
+    id to pass as `since` next time. Ids are AUTOINCREMENT, so they are
+    never reused and only grow. A `since` ahead of the store (the file was
+    recreated, or the client's value is stale or made up) is reset to the
+    latest id, so the client resyncs instead of waiting forever.
+    """
+    # Fix the upper bound first so articles ingested mid-query are left
+    # for the next call rather than skipped
+    try:
+        conn = _conn()
+        latest = conn.execute("SELECT COALESCE(MAX(id), 0) FROM articles").fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"  [ERROR] Store lookup failed: {e}")
+        return [], since
+    if since > latest:
+        return [], latest
+
+    window, window_params = _in_window()
+    # As in sector_page, a sector without keywords has nothing stored
+    if sector == "all":
+        sql = f"SELECT a.* FROM articles a WHERE a.id > ? AND a.id <= ? AND {window}"
+        params = [since, latest] + window_params
+    else:
+        sql = (
+            "SELECT a.* FROM article_sectors s JOIN articles a ON a.id = s.article_id"
+            " WHERE s.sector = ? AND s.article_id > ? AND s.article_id <= ?"
+            f" AND s.score >= ? AND {window}"
+        )
+        params = [sector, since, latest, threshold] + window_params
+    sql += " ORDER BY a.id LIMIT ?"
+    params.append(limit)
+
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        print(f"  [ERROR] Store lookup failed: {e}")
+        return [], since
+    # A full page may have more behind it: resume after its last row
+    next_since = rows[-1]["id"] if rows and len(rows) == limit else latest
+    return [_to_article(row) for row in rows], next_since
+
+
+def wait_for_articles(since, timeout):
+    """
+    Block until an article newer than id `since` is stored, or timeout
+    seconds pass. Returns latest_id().
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        latest = latest_id()
+        remaining = deadline - time.monotonic()
+        if latest > since or remaining <= 0:
+            return latest
+        with _arrived:
+            _arrived.wait(min(remaining, POLL_INTERVAL))
+
+
+def sector_scores(urls, sector):
+    """Precomputed scores for a sector, as {url: score}, for stored URLs."""
+    urls = [url for url in urls if url]
+    if not urls or sector not in SECTOR_KEYWORDS:
+        return {}
+    placeholders = ", ".join("?" * len(urls))
+    try:
+        rows = _conn().execute(
+            "SELECT a.url, s.score FROM articles a"
+            " JOIN article_sectors s ON s.article_id = a.id"
+            f" WHERE s.sector = ? AND a.url IN ({placeholders})",
+            [sector] + urls,
+        ).fetchall()
+    except sqlite3.Error as e:
+        print(f"  [ERROR] Store lookup failed: {e}")
+        return {}
+    return {row["url"]: row["score"] for row in rows}
+
+
+def is_fresh(sector, ttl=STORE_TTL):
+    """True if the sources for a sector were fetched within ttl seconds."""
+    try:
+        row = _conn().execute(
+            "SELECT refreshed_at FROM sector_refreshes WHERE sector = ?",
+            (sector,),
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"  [ERROR] Store lookup failed: {e}")
+        return False
+    return row is not None and time.time() - row[0] < ttl
+
+
+def mark_fresh(sector):
+    try:
+        conn = _conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sector_refreshes (sector, refreshed_at)"
+                " VALUES (?, ?)",
+                (sector, time.time()),
+            )
+    except sqlite3.Error as e:
+        print(f"  [ERROR] Store update failed: {e}")
+
+
+def prune(days=RETENTION_DAYS):
+    """Drop articles ingested more than `days` ago."""
+    conn = _conn()
+    with conn:
+        conn.execute(
+            "DELETE FROM articles WHERE ingested_at < ?",
+            (time.time() - days * 86400,),
+        )
+
+
+def _in_window():
+    """SQL condition (on alias a) and params for sector-stream articles."""
+    cutoff = time.time() - SECTOR_WINDOW
+    return (
+        "a.origin = 'feed' AND (a.published_ts >= ?"
+        " OR (a.published_ts = 0 AND a.ingested_at >= ?))",
+        [int(cutoff), cutoff],
+    )
+
+
+def _published_ts(article):
+    """The article's published_ts, parsing published for older cached articles; 0 if unknown."""
+    ts = article.get("published_ts")
+    if ts is None:
+        ts = to_epoch(article.get("published"))
+    return ts or 0
+
+
+def _to_article(row):
+    return Article(*(row[field] for field in FIELDS))
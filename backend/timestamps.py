@@ -0,0 +1,49 @@
+"""
+Published-date normalization.
+Sources date articles in different formats: RSS uses RFC 822
+("Tue, 14 Oct 2025 09:30:00 GMT"), NYT and Guardian use ISO 8601 and
+NewsAPI sends an ISO 8601 publishedAt. Fetchers convert each date once,
+when they clean an article, to published_ts: integer seconds since the
+epoch (UTC). Sorting and time windows then compare ints and never parse
+strings.
+"""
+
+import calendar
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+def to_epoch(value):
+    """
+    UTC epoch seconds for a published date, or None if it can't be parsed.
+    Accepts ISO 8601 or RFC 822 strings, or a UTC time.struct_time such as
+    feedparser's published_parsed. A date without a timezone is taken as UTC.
+    """
+    if not value:
+        return None
+    if isinstance(value, time.struct_time):
+        return calendar.timegm(value)
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    value = value.strip()
+    try:
+        # fromisoformat only accepts a "Z" suffix from Python 3.11
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def entry_epoch(entry):
+    """published_ts for a feedparser entry: its parsed date, else the raw string."""
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    if parsed:
+        return calendar.timegm(parsed)
+    return to_epoch(entry.get("published", entry.get("updated")))
@@ -0,0 +1,255 @@
+"""
+Shared HTTP transport for every fetcher.
+Sync fetchers go through one requests.Session and async ones through one
+httpx.AsyncClient per event loop. Both keep per-host connection pools
+alive between calls, ask for compressed responses, and retry 429/5xx
+answers and refused or reset connections a bounded number of times with
+jittered exponential backoff. Timeouts are never retried: a host that
+didn't answer in time would only use up the caller's deadline again.
+Each call is also guarded by its source's circuit breaker (breaker.py),
+which may fail it fast or shorten its timeout.
+Per-host request, connection and retry counts are kept for /api/stats.
+"""
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from breaker import get_breaker
+
+try:
+    import brotli  # noqa: F401 -- lets requests/httpx decode br responses
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# Per-host pools kept open (sync), and connections per host
+POOL_HOSTS = 64
+POOL_SIZE = 16
+
+# Connections one event loop may hold open at once (async)
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE = 32
+
+DEFAULT_TIMEOUT = 10
+
+# Retries after the first attempt, for these statuses or a refused/reset
+# connection
+MAX_RETRIES = 2
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# For quota-limited APIs: a 429 there means the quota is spent, and each
+# retry would be another call the quota budget (quota.py) never approved
+SERVER_ERRORS = {500, 502, 503, 504}
+
+# Connection failures worth retrying (async; for requests, see _send)
+ASYNC_RETRY_ERRORS = (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError)
+
+# Backoff before retry n is uniform in [0, BACKOFF_BASE * 2**n], capped at
+# BACKOFF_MAX, which also caps any Retry-After the upstream asks for.
+# Kept short so retries fit inside the aggregator's fan-out deadline.
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 3
+
+_session = None
+_session_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+# host -> counters; connections for sync requests are read from the pools
+_host_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_session():
+    """The shared requests.Session, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+            _session = session
+        return _session
+
+
+def get_async_client():
+    """The AsyncClient for the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            follow_redirects=True,
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """Close the running loop's client (call on shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, source=None,
+        retry_statuses=RETRY_STATUSES):
+    """
+    GET through the shared session, retrying as described above.
+    source names the breaker to use (default: the host); retry_statuses
+    the response statuses worth retrying. Returns the last response
+    (callers still raise_for_status); a connection error or timeout is
+    raised, and breaker.CircuitOpenError if the circuit is open.
+    """
+    host = _host(url)
+    circuit = get_breaker(source or host)
+    circuit.before_call()
+    try:
+        response = _send(
+            host, url, params, headers, circuit.timeout(timeout), retry_statuses)
+    except Exception as e:
+        circuit.record_failure(e)
+        raise
+    _record(circuit, response)
+    return response
+
+
+async def get_async(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, source=None,
+                    retry_statuses=RETRY_STATUSES):
+    """get() for the async fetchers, over the event loop's AsyncClient."""
+    host = _host(url)
+    circuit = get_breaker(source or host)
+    circuit.before_call()
+    try:
+        response = await _send_async(
+            host, url, params, headers, circuit.timeout(timeout), retry_statuses)
+    except (Exception, asyncio.CancelledError) as e:
+        circuit.record_failure(e)
+        raise
+    _record(circuit, response)
+    return response
+
+
+def _send(host, url, params, headers, timeout, retry_statuses):
+    for attempt in range(MAX_RETRIES + 1):
+        _count(host, "requests")
+        try:
+            response = get_session().get(
+                url, params=params, headers=headers, timeout=timeout)
+        except requests.exceptions.ConnectionError as e:
+            # ConnectTimeout is a ConnectionError too, but isn't retried
+            if attempt == MAX_RETRIES or isinstance(e, requests.exceptions.Timeout):
+                _count(host, "errors")
+                raise
+            delay = _backoff(attempt)
+        else:
+            if response.status_code not in retry_statuses or attempt == MAX_RETRIES:
+                return response
+            delay = _backoff(attempt, response.headers.get("Retry-After"))
+        _count(host, "retries")
+        time.sleep(delay)
+
+
+async def _send_async(host, url, params, headers, timeout, retry_statuses):
+    async def trace(event, info):
+        if event == "connection.connect_tcp.complete":
+            _count(host, "async_connections")
+
+    for attempt in range(MAX_RETRIES + 1):
+        _count(host, "requests")
+        try:
+            response = await get_async_client().get(
+                url, params=params, headers=headers, timeout=timeout,
+                extensions={"trace": trace})
+        except ASYNC_RETRY_ERRORS:
+            if attempt == MAX_RETRIES:
+                _count(host, "errors")
+                raise
+            delay = _backoff(attempt)
+        else:
+            if response.status_code not in retry_statuses or attempt == MAX_RETRIES:
+                return response
+            delay = _backoff(attempt, response.headers.get("Retry-After"))
+        _count(host, "retries")
+        await asyncio.sleep(delay)
+
+
+def _record(circuit, response):
+    """A 5xx or 429 that survived the retries counts against the source."""
+    if response.status_code in RETRY_STATUSES:
+        circuit.record_failure(f"HTTP {response.status_code}")
+    else:
+        circuit.record_success(response.elapsed.total_seconds())
+
+
+def _backoff(attempt, retry_after=None):
+    """Seconds to wait before retry number attempt + 1."""
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass  # an HTTP date; fall back to our own backoff
+    return random.uniform(0, min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX))
+
+
+def _host(url):
+    parts = urlsplit(url)
+    return _host_label(parts.scheme, parts.hostname, parts.port)
+
+
+def _host_label(scheme, hostname, port):
+    """hostname, plus the port when it isn't the scheme's default."""
+    if port is None or port == {"http": 80, "https": 443}.get(scheme):
+        return hostname
+    return f"{hostname}:{port}"
+
+
+def _count(host, field):
+    with _stats_lock:
+        stats = _host_stats.setdefault(
+            host, {"requests": 0, "retries": 0, "errors": 0, "async_connections": 0})
+        stats[field] += 1
+
+
+def transport_stats():
+    """
+    Per-host counters (this process only). connections is how many new
+    connections were opened; the rest of the requests reused a pooled one.
+    """
+    opened = {}
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    host = _host_label(pool.scheme, pool.host, pool.port)
+                    opened[host] = opened.get(host, 0) + pool.num_connections
+
+    hosts = {}
+    with _stats_lock:
+        for host, stats in _host_stats.items():
+            connections = opened.get(host, 0) + stats["async_connections"]
+            requests_made = stats["requests"]
+            hosts[host] = {
+                "requests": requests_made,
+                "connections": connections,
+                "retries": stats["retries"],
+                "errors": stats["errors"],
+                "reuse_rate": (
+                    round(1 - min(connections, requests_made) / requests_made, 3)
+                    if requests_made else None
+                ),
+            }
+    return {"accept_encoding": ACCEPT_ENCODING, "hosts": hosts}
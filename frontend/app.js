@@ -67,6 +67,7 @@ const COMING_SOON_AI = {
 const mainContent = document.getElementById("main-content");
 const feedGrid = document.getElementById("feed-grid");
 const headlinesList = document.getElementById("headlines-list");
+const feedSentinel = document.getElementById("feed-sentinel");
 const loadingEl = document.getElementById("loading");
 const errorEl = document.getElementById("error");
 const emptyEl = document.getElementById("empty");
@@ -83,6 +84,8 @@ const mobileMenuBtn = document.getElementById("mobile-menu-btn");
 let currentSector = "all";
 let currentView = "feed";
 let currentArticles = [];
+let nextCursor = null;
+let loadingMore = false;
 
 // ========== NAVIGATION ==========
 sectorItems.forEach(item => {
@@ -187,11 +190,45 @@ pyramidRows.forEach(row => {
 
 
 // ========== DATA FETCHING ==========
+// Sector news streams in as newline-delimited JSON: cards render as each
+// source finishes, then the final event swaps in the ranked list.
 async function fetchSectorNews(sector) {
+  nextCursor = null;
   showLoading();
   clearError();
   hideEmpty();
 
+  try {
+    const response = await fetch(`${API_BASE}/news/stream?sector=${sector}&count=16`);
+    if (!response.ok || !response.body) {
+      return fetchSectorNewsJson(sector);
+    }
+
+    let streamed = [];
+    await readNdjson(response, event => {
+      // Ignore a stream the user has already navigated away from
+      if (sector !== currentSector) return;
+
+      if (event.event === "error") {
+        showError(event.error);
+      } else if (event.event === "source" && event.articles.length) {
+        streamed = streamed.concat(event.articles).slice(0, 16);
+        showArticles(streamed, sector);
+      } else if (event.event === "final") {
+        if (!event.articles || event.articles.length === 0) {
+          showEmpty();
+          return;
+        }
+        nextCursor = event.next_cursor || null;
+        showArticles(event.articles, sector);
+      }
+    });
+  } catch (err) {
+    showError("Could not connect to the news server. Is the backend running?");
+  }
+}
+
+async function fetchSectorNewsJson(sector) {
   try {
     const response = await fetch(`${API_BASE}/news?sector=${sector}&count=16`);
     const data = await response.json();
@@ -206,16 +243,68 @@ async function fetchSectorNews(sector) {
       return;
     }
 
-    currentArticles = data.articles;
-
-    renderFeed(data.articles, sector);
-    renderHeadlines(data.articles, sector);
+    nextCursor = data.next_cursor || null;
+    showArticles(data.articles, sector);
   } catch (err) {
     showError("Could not connect to the news server. Is the backend running?");
   }
 }
 
+// Infinite scroll: when the sentinel below the feed comes into view, fetch
+// the page after nextCursor. Later pages come from the backend's article
+// store, so they are cheap and never re-fetch the sources.
+async function fetchMoreNews() {
+  if (!nextCursor || loadingMore) return;
+  const sector = currentSector;
+  const cursor = nextCursor;
+  loadingMore = true;
+
+  try {
+    const response = await fetch(
+      `${API_BASE}/news?sector=${sector}&count=16&cursor=${encodeURIComponent(cursor)}`);
+    const data = await response.json();
+    // Ignore a page for a feed the user has since left (or searched over)
+    if (sector !== currentSector || cursor !== nextCursor || data.error) return;
+
+    const seen = new Set(currentArticles.map(a => a.url));
+    nextCursor = data.next_cursor || null;
+    showArticles(currentArticles.concat(data.articles.filter(a => !seen.has(a.url))), sector);
+  } catch (err) {
+    // Leave the cursor so the next scroll retries
+  } finally {
+    loadingMore = false;
+  }
+}
+
+new IntersectionObserver(entries => {
+  if (entries.some(entry => entry.isIntersecting)) fetchMoreNews();
+}, { rootMargin: "600px" }).observe(feedSentinel);
+
+async function readNdjson(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
+function showArticles(articles, sector) {
+  currentArticles = articles;
+  renderFeed(articles, sector);
+  renderHeadlines(articles, sector);
+}
+
 async function searchNews(query) {
+  nextCursor = null;
   showLoading();
   clearError();
   hideEmpty();